@@ -1,15 +1,24 @@
 import time
-import dateparser
 import os
 from dotenv import load_dotenv
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for
 from flask_session import Session
+from googleapiclient.errors import HttpError
+from google.auth.exceptions import RefreshError
+from oauthlib.oauth2.rfc6749.errors import OAuth2Error
 from calenderinternal import (
-    authenticate_services, correct_schedule_spelling, extract_delete_details, get_event_by_name, is_schedule_intent,
+    correct_schedule_spelling, extract_delete_details, get_event_by_name, is_schedule_intent,
     is_update_intent, is_delete_intent, extract_event_details,
     parse_datetime, send_invitation, wait_for_acceptance, create_event, send_email,
-    delete_event,extract_update_details, chat
+    delete_event,extract_update_details, ask
 )
+from prompts import token_report
+from auditlog import log_event, current_conversation, new_conversation_id
+from timezones import detect_user_zone, format_for_participant
+from responses import validate_date, validate_time_range
+from scheduler import propose_alternatives, slot_fields
+from tenants import authorization_url, complete_authorization, get_services, forget_user, tenant_of, take_quota
+from sync import ensure_watching, register_webhooks, resume_watching, sync_report
 
 load_dotenv()
 
@@ -17,15 +26,59 @@ app = Flask(__name__)
 app.secret_key = os.environ.get("FLASK_SECRET_KEY")
 app.config["SESSION_TYPE"] = "filesystem"
 Session(app)
+register_webhooks(app)
+resume_watching()
 
-services = authenticate_services()
 REQUIRED_FIELDS = ["participant_email", "event_name", "event_date", "event_time"]
+# Survive the end of a conversation; everything else in the session is per conversation
+PERSISTENT_KEYS = ("user", "timezone", "locale")
+
+def reset_session():
+    kept = {key: session[key] for key in PERSISTENT_KEYS if key in session}
+    session.clear()
+    session.update(kept)
 
 @app.route('/')
 def index():
-    session.clear()
+    reset_session()
     return render_template('index.html')
 
+@app.route('/login')
+def login():
+    url, state, code_verifier = authorization_url()
+    session['oauth_state'] = state
+    session['oauth_code_verifier'] = code_verifier
+    return redirect(url)
+
+@app.route('/oauth2callback')
+def oauth2callback():
+    state = session.pop('oauth_state', None)
+    code_verifier = session.pop('oauth_code_verifier', None)
+    retry = f'<a href="{url_for("login")}">Sign in again</a>'
+    if state is None:
+        return f"Sign-in was not started from this browser. {retry}", 400
+    # Denied consent, a state mismatch or an expired code all land here
+    try:
+        user, _ = complete_authorization(state, code_verifier, request.query_string.decode())
+    except OAuth2Error as e:
+        print(f"❗ Sign-in failed: {e}")
+        return f"Sign-in didn't complete. {retry}", 400
+    session['user'] = user
+    ensure_watching(user, get_services(user))
+    return redirect(url_for('index'))
+
+@app.route('/sync-stats')
+def sync_stats():
+    if 'user' not in session:
+        return jsonify({"error": "sign in first"}), 401
+    return jsonify(sync_report())
+
+@app.route('/prompt-stats')
+def prompt_stats():
+    if 'user' not in session:
+        return jsonify({"error": "sign in first"}), 401
+    return jsonify(token_report())
+
 def get_missing_field_prompt(current_data):
     missing = [field for field in REQUIRED_FIELDS if field not in current_data]
     questions = {
@@ -39,10 +92,47 @@ def get_missing_field_prompt(current_data):
         return field, f"{questions[field]}"
     return None, None
 
+def sign_in_again():
+    session.pop('user', None)
+    return jsonify({"reply": f"🔑 Your Google sign-in has expired. Please sign in again: {url_for('login', _external=True)}"}), 401
+
 @app.route('/chat', methods=['POST'])
 def chat_route():
     user_input = request.json.get("message", "").strip()
+
+    if 'user' not in session:
+        return jsonify({"reply": f"🔑 Please sign in with Google first: {url_for('login', _external=True)}"}), 401
+    services = get_services(session['user'])
+    if services is None:
+        return sign_in_again()
+    if not take_quota(tenant_of(session['user'])):
+        return jsonify({"reply": "⏳ Your organization has hit its request limit. Please try again in a minute."}), 429
+    ensure_watching(session['user'], services)
+
+    if 'conversation_id' not in session:
+        session['conversation_id'] = new_conversation_id()
+    conversation_id = session['conversation_id']
+    current_conversation.set(conversation_id)
+
+    # The browser sends its zone and locale on every turn
+    if 'timezone' not in session or request.json.get("timezone"):
+        session['timezone'], session['locale'] = detect_user_zone(request.json, request.headers)
+
+    started = time.perf_counter()
+    # Cached clients only find out about a revoked or expired refresh token on their next call
+    try:
+        response = handle_chat(user_input, services)
+    except RefreshError as e:
+        print(f"❗ Google sign-in for {session['user']} no longer works: {e}")
+        forget_user(session['user'])
+        return sign_in_again()
+    log_event("turn", user=session.get('user'), message=user_input, reply=response.get_json().get("reply"),
+              latency_ms=round((time.perf_counter() - started) * 1000, 1))
+    return response
+
+def handle_chat(user_input, services):
     user_input = correct_schedule_spelling(user_input)
+    tz_name, locale = session['timezone'], session['locale']
 
     if 'data' not in session:
         session['data'] = {}
@@ -56,8 +146,20 @@ def chat_route():
         field = session['waiting_for']
         intent = session.get('intent')
 
-        if intent == 'schedule':
-            extracted = extract_event_details(user_input)
+        if intent == 'schedule' and field == 'alternative':
+            choice = user_input.strip().rstrip(".")
+            options = session.get('alternatives', [])
+            if choice.isdigit() and 1 <= int(choice) <= len(options):
+                data['event_date'], data['event_time'] = options[int(choice) - 1]
+                session['data'] = data
+                session.pop('waiting_for')
+                session.pop('alternatives')
+            else:
+                reset_session()
+                return jsonify({"reply": "👍 Okay, I won't reschedule it."})
+
+        elif intent == 'schedule':
+            extracted = {} if field == "event_name" else extract_event_details(user_input, tz_name, locale, fields=[field])
             if field == "event_name" and user_input.strip():
                 data[field] = user_input.strip()
                 session['data'] = data
@@ -74,15 +176,19 @@ def chat_route():
                 session['data'][field] = user_input.strip()
                 session.pop('waiting_for')
             elif field == "new_date":
-                parsed = dateparser.parse(user_input, settings={'PREFER_DATES_FROM': 'future'})
-                if parsed:
-                    session['data'][field] = parsed.strftime('%Y-%m-%d')
+                new_date = validate_date(user_input, tz_name, locale)
+                if new_date:
+                    session['data'][field] = new_date
                     session.pop('waiting_for')
                 else:
-                    return jsonify({"reply": "❗ Couldn't parse the date. Try again."})
+                    return jsonify({"reply": "❗ Couldn't read that as an upcoming date. Try again."})
             elif field == "new_time":
-                session['data'][field] = user_input
-                session.pop('waiting_for')
+                new_time = validate_time_range(user_input)
+                if new_time:
+                    session['data'][field] = new_time
+                    session.pop('waiting_for')
+                else:
+                    return jsonify({"reply": "❗ Couldn't read the time. Try something like 10am to 11am."})
             else:
                 return jsonify({"reply": f"❗ Invalid or missing {field}, please try again."})
 
@@ -99,18 +205,20 @@ def chat_route():
     if 'intent' not in session:
         if is_schedule_intent(user_input):
             session['intent'] = 'schedule'
-            extracted = extract_event_details(user_input)
+            extracted = extract_event_details(user_input, tz_name, locale)
             session['data'] = extracted
         elif is_update_intent(user_input):
             session['intent'] = 'update'
             session['update_text'] = user_input
-            session['data'] = extract_update_details(user_input)
+            session['data'] = extract_update_details(user_input, tz_name, locale)
         elif is_delete_intent(user_input):
             session['intent'] = 'delete'
             session['delete_text'] = user_input
             session['data'] = extract_delete_details(user_input)
         else:
-            reply = chat.send_message(f"""Reply to the users Message: "{user_input}" """).text
+            history = session.get('reply_history', [])
+            reply = ask("reply", history=history, message=user_input)
+            session['reply_history'] = history
             print(reply)
             return jsonify({"reply": reply})
 
@@ -124,26 +232,48 @@ def chat_route():
             return jsonify({"reply": prompt})
 
         details = session['data']
-        start_time, end_time = parse_datetime(details['event_date'], details['event_time'])
+        start_time, end_time = parse_datetime(details['event_date'], details['event_time'], tz_name, locale)
+        if start_time is None:
+            for field in ('event_date', 'event_time'):
+                details.pop(field)
+            session['data'] = details
+            session['waiting_for'] = 'event_date'
+            return jsonify({"reply": "❗ I couldn't read that date and time. When is the meeting? (e.g. tomorrow or April 8)"})
 
         msg1 = f"📨 Invitation email sent to {details['participant_email']}."
 
-        sent_time, mail_check = send_invitation(services['gmail'], details['participant_email'], details['event_date'], details['event_time'])
+        sent_time, mail_check = send_invitation(services['gmail'], details['participant_email'], details['event_date'], details['event_time'], start_time, end_time, session['user'])
         
 
-        if wait_for_acceptance(services['gmail'], details['participant_email'], sent_time):
+        if wait_for_acceptance(services['gmail'], details['participant_email'], sent_time, session['user']):
             create_event(
                 services['calendar'],
                 summary=details['event_name'],
                 start_time=start_time,
                 end_time=end_time,
-                participant_email=details['participant_email']
+                participant_email=details['participant_email'],
+                time_zone=tz_name
             )
             msg3 = f"✅ Event '{details['event_name']}' scheduled successfully."
         else:
             msg3 = "❌ The attendee has rejected the event."
-
-        session.clear()
+            # Alternatives are a bonus; without free/busy access the plain rejection still goes out
+            try:
+                slots = propose_alternatives(services['calendar'], [details['participant_email']], start_time, end_time, tz_name)
+            except HttpError as e:
+                print(f"❗ Couldn't look up free/busy: {e}")
+                slots = []
+            if slots:
+                options = [slot_fields(start, end, tz_name) for start, end in slots]
+                listed = "\n".join(f"{i}. {day} {hours}" for i, (day, hours) in enumerate(options, 1))
+                session['alternatives'] = options
+                session['waiting_for'] = 'alternative'
+                for field in ('event_date', 'event_time'):
+                    details.pop(field)
+                session['data'] = details
+                return jsonify({"reply": f"{msg3} These times work for everyone:\n{listed}\nReply with a number to send a new invitation, or anything else to stop."})
+
+        reset_session()
         return jsonify({"reply": msg3})
 
     elif intent == 'update':
@@ -160,13 +290,19 @@ def chat_route():
                 session['waiting_for'] = field
                 return jsonify({"reply": prompt})
 
-        new_start, new_end = parse_datetime(details['new_date'], details['new_time'])
+        new_start, new_end = parse_datetime(details['new_date'], details['new_time'], tz_name, locale)
+        if new_start is None:
+            for field in ('new_date', 'new_time'):
+                details.pop(field)
+            session['data'] = details
+            session['waiting_for'] = 'new_date'
+            return jsonify({"reply": "❗ I couldn't read that date and time. 📅 New date (e.g. April 21): "})
 
         print(new_start,new_end)
 
-        event = get_event_by_name(services['calendar'], details['event_name'])
+        event = get_event_by_name(services['calendar'], details['event_name'], session['user'])
         if not event:
-            session.clear()
+            reset_session()
             return jsonify({"reply": "❗ Event to update not found."})
 
         email = event['attendees'][0]['email']
@@ -174,23 +310,24 @@ def chat_route():
             services['gmail'],
             email,
             f"Reschedule Request: {details['event_name']}",
-            f"Hi, would you be okay with rescheduling the meeting '{details['event_name']}' to:\n{new_start} to {new_end}?\n\nPlease reply 'Yes' to confirm."
+            f"Hi, would you be okay with rescheduling the meeting '{details['event_name']}' to:\n{format_for_participant(new_start, new_end, email, session['user'])}?\n\nPlease reply 'Yes' to confirm."
         )
 
         sent_time = time.time()
-        if wait_for_acceptance(services['gmail'], email, sent_time):
-            event['start']['dateTime'] = new_start
-            event['end']['dateTime'] = new_end
+        if wait_for_acceptance(services['gmail'], email, sent_time, session['user']):
+            event['start'] = {"dateTime": new_start, "timeZone": tz_name}
+            event['end'] = {"dateTime": new_end, "timeZone": tz_name}
             updated_event = services['calendar'].events().update(
                 calendarId='primary',
                 eventId=event['id'],
                 body=event,
                 sendUpdates='all'
             ).execute()
-            session.clear()
+            log_event("google", action="update_event", event_id=event['id'], start=new_start, end=new_end)
+            reset_session()
             return jsonify({"reply": f"✅ Event called '{details['event_name']}' rescheduled successfully to '{details['new_date']}'"})
         else:
-            session.clear()
+            reset_session()
             return jsonify({"reply": "❌ Reschedule rejected or no response."})
 
     elif intent == 'delete':
@@ -201,8 +338,8 @@ def chat_route():
             return jsonify({"reply": "🗑️ What is the name of the event you want to delete?"})
 
         # Try deleting the event
-        deleted = delete_event(services['calendar'], services['gmail'], details['event_name'])
-        session.clear()
+        deleted = delete_event(services['calendar'], services['gmail'], details['event_name'], session['user'])
+        reset_session()
         if deleted:
             return jsonify({"reply": f"⛔ Event '{details['event_name']}' deleted."})
         else:
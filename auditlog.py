@@ -0,0 +1,203 @@
+import os
+import sys
+import json
+import time
+import uuid
+import atexit
+import sqlite3
+import argparse
+import threading
+import contextvars
+from datetime import datetime
+from dotenv import load_dotenv
+
+load_dotenv()
+
+RETENTION_DAYS = int(os.environ.get("AUDIT_RETENTION_DAYS", "30"))
+FLUSH_SIZE = 64
+FLUSH_INTERVAL = 1.0
+COMPACT_INTERVAL = 3600
+
+# Set per request (or per CLI session) so deeper calls don't need the id passed through
+current_conversation = contextvars.ContextVar("current_conversation", default=None)
+
+_buffer = []
+_lock = threading.Lock()
+_wake = threading.Event()
+_writer = None
+
+
+def new_conversation_id():
+    return uuid.uuid4().hex[:12]
+
+
+# The path is read when connecting, so the simulator and tools can point AUDIT_DB_PATH elsewhere
+def connect(path=None):
+    conn = sqlite3.connect(path or os.environ.get("AUDIT_DB_PATH", "audit.db"))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("""CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY,
+        ts REAL NOT NULL,
+        conversation TEXT,
+        kind TEXT NOT NULL,
+        data TEXT NOT NULL
+    )""")
+    conn.execute("CREATE INDEX IF NOT EXISTS events_conversation ON events (conversation, id)")
+    return conn
+
+
+# Append an event to the in-memory batch; the writer thread does the disk I/O
+def log_event(kind, **data):
+    row = (
+        time.time(),
+        current_conversation.get(),
+        kind,
+        json.dumps(data, separators=(",", ":"), default=str, ensure_ascii=False)
+    )
+    with _lock:
+        _buffer.append(row)
+        full = len(_buffer) >= FLUSH_SIZE
+    if _writer is None:
+        start_writer()
+    if full:
+        _wake.set()
+
+
+def flush(conn=None):
+    with _lock:
+        rows = _buffer[:]
+        del _buffer[:]
+    if not rows:
+        return 0
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
+    with conn:
+        conn.executemany("INSERT INTO events (ts, conversation, kind, data) VALUES (?, ?, ?, ?)", rows)
+    if own_conn:
+        conn.close()
+    return len(rows)
+
+
+# Drop events past retention and reclaim the space
+def compact(conn=None, retention_days=RETENTION_DAYS):
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
+    cutoff = time.time() - retention_days * 86400
+    with conn:
+        deleted = conn.execute("DELETE FROM events WHERE ts < ?", (cutoff,)).rowcount
+    # VACUUM rewrites the whole file, so only pay for it when there is space to reclaim
+    if deleted:
+        conn.execute("VACUUM")
+    if own_conn:
+        conn.close()
+    return deleted
+
+
+def _write_loop():
+    conn = connect()
+    last_compact = time.time()
+    while True:
+        _wake.wait(FLUSH_INTERVAL)
+        _wake.clear()
+        try:
+            flush(conn)
+            if time.time() - last_compact > COMPACT_INTERVAL:
+                compact(conn)
+                last_compact = time.time()
+        except sqlite3.Error as e:
+            print(f"❗ Audit log write failed: {e}")
+
+
+def start_writer():
+    global _writer
+    with _lock:
+        if _writer is not None:
+            return
+        _writer = threading.Thread(target=_write_loop, name="audit-writer", daemon=True)
+    _writer.start()
+
+
+atexit.register(flush)
+
+
+def list_conversations(conn, limit):
+    return conn.execute("""SELECT conversation, MIN(ts), MAX(ts), COUNT(*),
+        SUM(kind = 'turn'), SUM(kind = 'model_call'), SUM(kind = 'google')
+        FROM events WHERE conversation IS NOT NULL
+        GROUP BY conversation ORDER BY MAX(ts) DESC LIMIT ?""", (limit,)).fetchall()
+
+
+def conversation_events(conn, conversation, kind=None):
+    query = "SELECT ts, kind, data FROM events WHERE conversation = ?"
+    params = [conversation]
+    if kind:
+        query += " AND kind = ?"
+        params.append(kind)
+    return conn.execute(query + " ORDER BY id", params).fetchall()
+
+
+def format_ts(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the assistant's audit log")
+    parser.add_argument("--db", help="defaults to $AUDIT_DB_PATH or audit.db")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_cmd = commands.add_parser("list", help="recent conversations")
+    list_cmd.add_argument("--limit", type=int, default=20)
+
+    show_cmd = commands.add_parser("show", help="all events of a conversation")
+    show_cmd.add_argument("conversation")
+    show_cmd.add_argument("--kind", help="only events of this kind (turn, extracted, model_call, google)")
+
+    replay_cmd = commands.add_parser("replay", help="the conversation as a chat transcript")
+    replay_cmd.add_argument("conversation")
+
+    export_cmd = commands.add_parser("export", help="extracted fields as JSON lines for offline evaluation")
+    export_cmd.add_argument("--conversation")
+
+    compact_cmd = commands.add_parser("compact", help="drop old events and vacuum")
+    compact_cmd.add_argument("--days", type=int, default=RETENTION_DAYS)
+
+    args = parser.parse_args(argv)
+    conn = connect(args.db)
+
+    if args.command == "list":
+        for conversation, first, last, events, turns, calls, actions in list_conversations(conn, args.limit):
+            print(f"{conversation}  {format_ts(first)} → {format_ts(last)}  "
+                  f"events={events} turns={turns} model_calls={calls} google={actions}")
+
+    elif args.command == "show":
+        for ts, kind, data in conversation_events(conn, args.conversation, args.kind):
+            print(f"{format_ts(ts)}  {kind:<10}  {data}")
+
+    elif args.command == "replay":
+        for ts, kind, data in conversation_events(conn, args.conversation, "turn"):
+            turn = json.loads(data)
+            print(f"[{format_ts(ts)}] You: {turn.get('message')}")
+            print(f"[{format_ts(ts)}] 🤖: {turn.get('reply')}")
+
+    elif args.command == "export":
+        query = "SELECT ts, conversation, data FROM events WHERE kind = 'extracted'"
+        params = []
+        if args.conversation:
+            query += " AND conversation = ?"
+            params.append(args.conversation)
+        for ts, conversation, data in conn.execute(query + " ORDER BY id", params):
+            record = json.loads(data)
+            record.update(ts=ts, conversation=conversation)
+            sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    elif args.command == "compact":
+        print(f"Deleted {compact(conn, args.days)} events older than {args.days} days.")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,26 +3,30 @@ import re
 import time
 import pickle
 import base64
-import dateparser
 import unicodedata
-from datetime import datetime, timedelta
+from datetime import datetime
 from dotenv import load_dotenv
 from email.mime.text import MIMEText
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from tenants import SCOPES, CREDENTIALS_PATH, build_services
+from sync import upcoming_events, mail_sequence, wait_for_mail
 import google.generativeai as genai
+from prompts import PROMPTS, render_prompt, record_usage, fits_budget
+from auditlog import log_event, current_conversation, new_conversation_id
+from responses import (
+    parse_yes_no, parse_json_object, find_date, find_time_range, validate_date, validate_time_range,
+    validate_event_name
+)
+from timezones import (
+    DEFAULT_TIMEZONE, DEFAULT_LOCALE, localize, utc_now_iso,
+    learn_participant_timezone, format_for_participant
+)
 
 load_dotenv()
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 
-SCOPES = [
-    "https://www.googleapis.com/auth/gmail.readonly",
-    "https://www.googleapis.com/auth/gmail.send",
-    "https://www.googleapis.com/auth/calendar.events"
-]
-CREDENTIALS_PATH = os.environ.get("CREDENTIALS_FILE_PATH")
 TOKEN_PATH = "token.pickle"
 
 REQUIRED_FIELDS = ["participant_email", "event_name", "event_date", "event_time"]
@@ -36,7 +40,25 @@ model = genai.GenerativeModel(
     }
 )
 
-chat = model.start_chat(history=[])
+# Turns of small talk the "reply" prompt sees
+REPLY_HISTORY_TURNS = 10
+
+# Run a registered prompt with its own generation config. A conversation passes its own
+# `history` list, which gets this turn appended, so no chat state is shared between users.
+def ask(name, history=None, **fields):
+    prompt_text = render_prompt(name, **fields)
+    config = PROMPTS[name]["config"]
+    turn = {"role": "user", "parts": [prompt_text]}
+    contents = prompt_text if history is None else history + [turn]
+    started = time.perf_counter()
+    response = model.generate_content(contents, generation_config=config)
+    usage = record_usage(name, prompt_text, response, started)
+    answer = response.text.strip()
+    log_event("model_call", answer=answer, **usage)
+    if history is not None:
+        history += [turn, {"role": "model", "parts": [answer]}]
+        del history[:-2 * REPLY_HISTORY_TURNS]
+    return answer
 
 # Authenticate Google APIs
 def authenticate_services():
@@ -52,28 +74,33 @@ def authenticate_services():
             creds = flow.run_local_server(port=0)
         with open(TOKEN_PATH, "wb") as token:
             pickle.dump(creds, token)
-    return {
-        "gmail": build("gmail", "v1", credentials=creds),
-        "calendar": build("calendar", "v3", credentials=creds)
-    }
+    return build_services(creds)
 
-def send_invitation(gmail_service, recipient_email,meet_date,meet_time):
+def send_invitation(gmail_service, recipient_email,meet_date,meet_time, start_time=None, end_time=None, organizer=None):
     subject = "Meeting Invitation - Accept to Proceed"
-    body = f"Hi, please reply with 'Yes' if you accept the meeting invite on '{meet_date}' at '{meet_time}'."
+    if start_time and end_time:
+        when = format_for_participant(start_time, end_time, recipient_email, organizer)
+        body = f"Hi, please reply with 'Yes' if you accept the meeting invite on:\n{when}"
+    else:
+        body = f"Hi, please reply with 'Yes' if you accept the meeting invite on '{meet_date}' at '{meet_time}'."
     message = MIMEText(body)
     message['to'] = recipient_email
     message['from'] = "me"
     message['subject'] = subject
     raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
     message_body = {'raw': raw_message}
-    gmail_service.users().messages().send(userId="me", body=message_body).execute()
+    sent = gmail_service.users().messages().send(userId="me", body=message_body).execute()
+    log_event("google", action="send_invitation", to=recipient_email, message_id=sent.get("id"))
     print(f"\n📨 Invitation email sent to {recipient_email}.")
     #return True
     return time.time(),"yes"
 
-def wait_for_acceptance(gmail_service, expected_email, since_timestamp):
+# With Gmail push active for `user` we sleep until a notification instead of polling every 6 seconds
+def wait_for_acceptance(gmail_service, expected_email, since_timestamp, user=None):
     print("⏳ Waiting for response...")
-    for _ in range(300):
+    deadline = time.time() + 300 * 6
+    while time.time() < deadline:
+        seen = mail_sequence(user)
         response = gmail_service.users().messages().list(
             userId="me",
             q=f"from:{expected_email} newer_than:1d",
@@ -86,22 +113,32 @@ def wait_for_acceptance(gmail_service, expected_email, since_timestamp):
             if internal_date > since_timestamp:
                 snippet = full_msg.get("snippet", "").lower()
                 reply_only = re.split(r"\s*on\s.+?wrote:", snippet)[0].strip()
+                headers = full_msg.get("payload", {}).get("headers", [])
+                date_header = next((h["value"] for h in headers if h["name"].lower() == "date"), None)
+                if date_header:
+                    learn_participant_timezone(expected_email, date_header, user)
                
                 if any(word in reply_only for word in ["yes", "accepted", "i accept"]):
                     print("✅ The Attendee has accepted the event")
+                    log_event("google", action="acceptance", email=expected_email, accepted=True, reply=reply_only)
                     return True
                 else:
                     print("❌ The attendee has rejected the event.")
+                    log_event("google", action="acceptance", email=expected_email, accepted=False, reply=reply_only)
                     return False
-        time.sleep(6)
+        if seen is None:
+            time.sleep(6)
+        else:
+            wait_for_mail(user, seen, min(60, max(deadline - time.time(), 0)))
     print("❌ No response received in time.")
+    log_event("google", action="acceptance", email=expected_email, accepted=False, reply=None)
     return False
 
-def create_event(calendar_service, summary, start_time, end_time, participant_email):
+def create_event(calendar_service, summary, start_time, end_time, participant_email, time_zone=DEFAULT_TIMEZONE):
     event = {
         "summary": summary,
-        "start": {"dateTime": start_time, "timeZone": "Asia/Kolkata"},
-        "end": {"dateTime": end_time, "timeZone": "Asia/Kolkata"},
+        "start": {"dateTime": start_time, "timeZone": time_zone},
+        "end": {"dateTime": end_time, "timeZone": time_zone},
         "attendees": [{"email": participant_email}],
         "conferenceData": {
             "createRequest": {
@@ -116,6 +153,8 @@ def create_event(calendar_service, summary, start_time, end_time, participant_em
         sendUpdates="all",
         conferenceDataVersion=1
     ).execute()
+    log_event("google", action="create_event", event_id=created_event.get("id"), summary=summary,
+              start=start_time, end=end_time, attendee=participant_email)
     print(f"\n✅ Event created: {created_event.get('htmlLink')}")
     print(f"🗓️ Meet Link: {created_event.get('conferenceData', {}).get('entryPoints', [{}])[0].get('uri', 'N/A')}")
 
@@ -124,9 +163,9 @@ def create_event(calendar_service, summary, start_time, end_time, participant_em
 def normalize(text):
     return unicodedata.normalize('NFKD', text).strip().lower()
 
-def get_event_by_name(calendar_service, event_name):
-    now = datetime.utcnow().isoformat() + 'Z'
-    events = calendar_service.events().list(
+def list_upcoming_events(calendar_service):
+    now = utc_now_iso()
+    return calendar_service.events().list(
         calendarId='primary',
         timeMin=now,
         maxResults=10,
@@ -134,6 +173,11 @@ def get_event_by_name(calendar_service, event_name):
         orderBy='startTime'
     ).execute().get('items', [])
 
+def get_event_by_name(calendar_service, event_name, user=None):
+    events = upcoming_events(user)
+    if events is None:
+        events = list_upcoming_events(calendar_service)
+
     for event in events:
         print(event)
         if event.get('summary', '').lower() == event_name.lower():
@@ -149,17 +193,20 @@ def update_event(calendar_service, gmail_service, text):
         details['event_name'] = input("🤖 Gemini: What is the event name to update?\nYou: ").strip()
     if "new_date" not in details:
         new_date_input = input("📅 New date (e.g. April 21): ")
-        parsed = dateparser.parse(new_date_input, settings={'PREFER_DATES_FROM': 'future'})
-        if parsed:
-            details['new_date'] = parsed.strftime('%Y-%m-%d')
+        new_date = validate_date(new_date_input)
+        if new_date:
+            details['new_date'] = new_date
         else:
-            print("❗ Couldn't parse the date. Try again.")
+            print("❗ Couldn't read that as an upcoming date. Try again.")
             return
     if "new_time" not in details:
         details['new_time'] = input("🕐 New time (e.g. 10am to 11am): ")
 
     # Parse datetime range
     new_start, new_end = parse_datetime(details['new_date'], details['new_time'])
+    if new_start is None:
+        print("❗ Couldn't read that date and time.")
+        return
 
     print(f"🪪 Extracted Event Name: {details['event_name']}")
 
@@ -176,19 +223,20 @@ def update_event(calendar_service, gmail_service, text):
         gmail_service,
         email,
         f"Reschedule Request: {details['event_name']}",
-        f"Hi, would you be okay with rescheduling the meeting '{details['event_name']}' to:\n{new_start} to {new_end}?\n\nPlease reply 'Yes' to confirm."
+        f"Hi, would you be okay with rescheduling the meeting '{details['event_name']}' to:\n{format_for_participant(new_start, new_end, email)}?\n\nPlease reply 'Yes' to confirm."
     )
 
     sent_time = time.time()
     if wait_for_acceptance(gmail_service, email, sent_time):
-        event['start']['dateTime'] = new_start
-        event['end']['dateTime'] = new_end
+        event['start'] = {"dateTime": new_start, "timeZone": DEFAULT_TIMEZONE}
+        event['end'] = {"dateTime": new_end, "timeZone": DEFAULT_TIMEZONE}
         updated_event = calendar_service.events().update(
             calendarId='primary',
             eventId=event['id'],
             body=event,
             sendUpdates='all'
         ).execute()
+        log_event("google", action="update_event", event_id=event['id'], start=new_start, end=new_end)
         print(f"✅ Event rescheduled: {updated_event.get('htmlLink')}")
     else:
         print("❌ Reschedule rejected or no response.")
@@ -200,22 +248,19 @@ def send_email(gmail_service, recipient, subject, body):
     message['from'] = "me"
     message['subject'] = subject
     raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
-    gmail_service.users().messages().send(userId="me", body={"raw": raw}).execute()
+    sent = gmail_service.users().messages().send(userId="me", body={"raw": raw}).execute()
+    log_event("google", action="send_email", to=recipient, subject=subject, message_id=sent.get("id"))
 
-def delete_event(calendar_service, gmail_service, event_name):
-    now = datetime.utcnow().isoformat() + 'Z'
-    events = calendar_service.events().list(
-        calendarId='primary',
-        timeMin=now,
-        maxResults=10,
-        singleEvents=True,
-        orderBy='startTime'
-    ).execute().get('items', [])
+def delete_event(calendar_service, gmail_service, event_name, user=None):
+    events = upcoming_events(user)
+    if events is None:
+        events = list_upcoming_events(calendar_service)
 
     for event in events:
         if event.get('summary', '').lower() == event_name.lower():
             attendees = event.get('attendees', [])
             calendar_service.events().delete(calendarId='primary', eventId=event['id']).execute()
+            log_event("google", action="delete_event", event_id=event['id'], summary=event_name)
             print(f" ⛔ Deleted: {event_name}")
             for attendee in attendees:
                 send_email(gmail_service, attendee['email'], f"Event Cancelled: {event_name}",
@@ -225,125 +270,62 @@ def delete_event(calendar_service, gmail_service, event_name):
     return False
 
 
-def extract_update_details(text):
+# Fill the wanted fields with the local extractors first; one JSON-mode model call covers the rest,
+# and its answers must pass the local validators to be accepted. With unique=True the local
+# extractors only count when the message has exactly one candidate, and `notes` tell the model
+# which of several values is meant.
+def extract_fields(text, wanted, tz_name=DEFAULT_TIMEZONE, locale=DEFAULT_LOCALE, unique=False, notes=None):
+    notes = notes or {}
+    found = {}
+    if "event_date" in wanted:
+        event_date = find_date(text, tz_name, locale, unique)
+        if event_date:
+            found['event_date'] = event_date
+    if "event_time" in wanted:
+        event_time = find_time_range(text, unique)
+        if event_time:
+            found['event_time'] = event_time
+
+    missing = [field for field in wanted if field not in found]
+    if not missing:
+        return found
+
+    fields = ", ".join(f"{field} ({notes[field]})" if field in notes else field for field in missing)
+    answer = parse_json_object(ask("extract_fields", fields=fields, message=text.lower()))
+    validators = {
+        "event_name": validate_event_name,
+        "event_date": lambda value: validate_date(value, tz_name, locale),
+        "event_time": validate_time_range
+    }
+    for field in missing:
+        value = validators[field](answer.get(field))
+        if value:
+            found[field] = value
+    return found
+
+
+def extract_update_details(text, tz_name=DEFAULT_TIMEZONE, locale=DEFAULT_LOCALE):
+    # A reschedule often names the old slot too, so only an unambiguous local match skips the model
+    extracted = extract_fields(text, ["event_name", "event_date", "event_time"], tz_name, locale, unique=True, notes={
+        "event_date": "the new date the event should move to",
+        "event_time": "the new time the event should move to"
+    })
     details = {}
-    text_lower = text.lower()
-
-    prompt = f""" you are an expert in identifying the event date from the given user input , it can be even with spelling error but 
-    you are an expert model so you must autocorrect the spelling errors and extract the date correctly and return it in the format which
-    will be accepted by the google calendar api 
-    Message: "{text_lower}" """
-    eve_date = chat.send_message(prompt)
-    event_date_text = eve_date.candidates[0].content.parts[0].text.strip()
-
-    prompt = f""" you are an expert in identifying whether there is any date in the message or not, if you found 
-    any information that it says there is no date specified in this message, or any message that is not related to date format then 
-    return "no" else return "yes"
-    Message: "{event_date_text}" """
-    is_event_date = chat.send_message(prompt)
-    is_event_date = is_event_date.candidates[0].content.parts[0].text.strip()
-   
-    if is_event_date == "yes":
-        details['new_date'] = event_date_text
-
-    print(event_date_text)
-
-
-    
-    # 1. Extract new date first (in case event name appears before/after)
-    '''month_pattern = r"(jan|feb|mar|apr|aprl|apl|may|jun|jul|aug|sep|sept|oct|nov|dec|" \
-                    r"january|february|march|april|may|june|july|august|" \
-                    r"september|october|november|december)"
-    date_match = re.search(rf"\b{month_pattern}\s+\d{{1,2}}\b", text_lower)
-    if date_match:
-        parsed_date = dateparser.parse(date_match.group(0), settings={'PREFER_DATES_FROM': 'future'})
-        if parsed_date:
-            details['new_date'] = parsed_date.strftime('%Y-%m-%d')'''
-    
-    
-    prompt = f""" you are an expert in identifying the event timing from the given user input, it can be even with spelling error but 
-    you are an expert model so you must auto correct the spelling errors and extract the timing correctly and make sure there is the start
-    and end timing and return it in this format example "3pm to 4pm"
-    Message: "{text_lower}" """
-    eve_time = chat.send_message(prompt)
-    event_time_text = eve_time.candidates[0].content.parts[0].text.strip()
-
-    prompt = f""" you are an expert in identifying whether there is any timing format in the message or not, if you found 
-    any information that it says there is no timing specified in this message, or any message that is not related to timing format then 
-    return "no" else return "yes"
-    Message: "{event_time_text}" """
-    is_event_time = chat.send_message(prompt)
-    is_event_time = is_event_time.candidates[0].content.parts[0].text.strip()
-    print(is_event_time)
-   
-    if is_event_time == "yes":
-        details['new_time'] = event_time_text
-
-    print(event_time_text)
-       
-
-    # 2. Extract new time
-    '''time_match = re.search(r"(\d{1,2}\s*(am|pm))\s*(to|till|until)\s*(\d{1,2}\s*(am|pm))", text_lower)
-    print(time_match)
-    if time_match:
-        details['new_time'] = time_match.group(0)
-        print(details['new_time'])'''
-
-    # 3. Extract event name using smart patterns
-    '''name_patterns = [
-        r"(?:update|reschedule|move|change|shift)\s+(?:the\s+)?(?:event|meeting)?\s*(?:named|called)?\s*['\"]?([a-zA-Z0-9 _-]+?)['\"]?(?:\s+(?:to|on|for))?",
-        r"(?:the\s+)?(?:event|meeting)?\s*['\"]?([a-zA-Z0-9 _-]+?)['\"]?\s+(?:needs to be|should be|must be|to be)?\s*(?:updated|moved|rescheduled)",
-        r"(?:reschedule|move|shift|update)\s+([a-zA-Z0-9 _-]+)\s+(?:to|on|for)",  # "reschedule heyy to april 20"
-        r"(?:update|reschedule|move|change|shift)\s+(?:the\s+)?(?:event|meeting)?\s*(?:named|called)?\s*['\"]?([a-zA-Z0-9 _-]+?)",
-    ]'''
-    
-    prompt = f""" you are an expert in identifying the event name from the user input.Now your task is to extract the
-    event name from the user input correctly
-    Message: "{text_lower}" """
-    eve_name = chat.send_message(prompt)
-    event_name_text = eve_name.candidates[0].content.parts[0].text.strip()
-
-    prompt = f""" you are an expert in identifying whether there is any event name in the message or not, if you found 
-    any information that it says there is no event name specified in this, it's being generic, then return "no" else return "yes"
-    Message: "{event_name_text}" """
-    is_event_name = chat.send_message(prompt)
-    is_event_name = is_event_name.candidates[0].content.parts[0].text.strip()
-   
-    if is_event_name == "yes":
-        details['event_name'] = event_name_text
-
-    '''for pattern in name_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            candidate = match.group(1).strip()
-            # Avoid falsely capturing the date as a name
-            if candidate.lower() not in text_lower[text_lower.find(candidate.lower()):text_lower.find(candidate.lower())+15]:
-                details['event_name'] = candidate
-                break'''
-
+    if 'event_name' in extracted:
+        details['event_name'] = extracted['event_name']
+    if 'event_date' in extracted:
+        details['new_date'] = extracted['event_date']
+    if 'event_time' in extracted:
+        details['new_time'] = extracted['event_time']
+
+    log_event("extracted", task="update", text=text, fields=details)
     print(details)
     return details
 
 def extract_delete_details(text):
-    details= {}
-    text_lower = text.lower()
-
-    prompt = f""" you are an expert in identifying the event name from the user input.Now your task is to extract the
-    event name from the user input correctly
-    Message: "{text_lower}" """
-    eve_name = chat.send_message(prompt)
-    event_name_text = eve_name.candidates[0].content.parts[0].text.strip()
-    
-    prompt = f""" you are an expert in identifying whether there is any event name in the message or not, if you found 
-    any information that it says there is no event name specified in this, it's being generic, then return "no" else return "yes"
-    Message: "{event_name_text}" """
-    is_event_name = chat.send_message(prompt)
-    is_event_name = is_event_name.candidates[0].content.parts[0].text.strip()
-   
-    if is_event_name == "yes":
-        details['event_name'] = event_name_text
-    
-   
+    details = extract_fields(text, ["event_name"])
+
+    log_event("extracted", task="delete", text=text, fields=details)
     print(details)
     return details
 
@@ -352,64 +334,28 @@ def extract_delete_details(text):
 
 
 
-def extract_event_details(text):
+def extract_event_details(text, tz_name=DEFAULT_TIMEZONE, locale=DEFAULT_LOCALE, fields=None):
+    wanted = fields or REQUIRED_FIELDS
     details = {}
 
     # Extract participant email
-    email_match = re.search(r"[\w\.-]+@[\w\.-]+", text)
-    if email_match:
-        details['participant_email'] = email_match.group(0)
-    
-    text_lower = text.lower()
+    if "participant_email" in wanted:
+        email_match = re.search(r"[\w\.-]+@[\w\.-]+", text)
+        if email_match:
+            details['participant_email'] = email_match.group(0)
 
-    # Extract event name only if "called" is mentioned
-    '''name_match = re.search(r"called\s+([^\.,\n]+)", text, re.IGNORECASE)
-    if name_match:
-        details['event_name'] = name_match.group(1).strip()'''
-    
-    prompt = f""" you are an expert in identifying the event name from the user input.Now your task is to extract the
-    event name from the user input correctly
-    Message: "{text_lower}" """
-    eve_name = chat.send_message(prompt)
-    event_name_text = eve_name.candidates[0].content.parts[0].text.strip()
-
-    prompt = f""" you are an expert in identifying whether there is any event name in the message or not, if you found 
-    any information that it says there is no event name specified in this, it's being generic, then return "no" else return "yes"
-    Message: "{event_name_text}" """
-    is_event_name = chat.send_message(prompt)
-    is_event_name = is_event_name.candidates[0].content.parts[0].text.strip()
-   
-    if is_event_name == "yes":
-        details['event_name'] = event_name_text
-    print(is_event_name)
-    print(event_name_text)
-
-
-    # Extract event date - look for "tomorrow" or flexible formats
-    if "tomorrow" in text_lower:
-        tomorrow = datetime.now() + timedelta(days=1)
-        details['event_date'] = tomorrow.strftime('%Y-%m-%d')
-    else:
-        month_patterns = r"(jan|feb|mar|apr|aprl|apl|may|jun|jul|aug|sep|sept|oct|nov|dec|january|february|march|april|may|june|july|august|september|october|november|december)"
-        date_match = re.search(rf"\b{month_patterns}\s+\d{{1,2}}\b", text_lower)
-        if date_match:
-            date_text = date_match.group(0)
-            parsed_date = dateparser.parse(date_text, settings={'PREFER_DATES_FROM': 'future'})
-            if parsed_date:
-                details['event_date'] = parsed_date.strftime('%Y-%m-%d')
-
-    # Extract event time
-    time_match = re.search(r"(\d{1,2}\s*(am|pm))\s*(to|too|till|til|until)\s*(\d{1,2}\s*(am|pm))", text_lower)
-    if time_match:
-        details['event_time'] = time_match.group(0)
+    details.update(extract_fields(text, [field for field in wanted if field != "participant_email"], tz_name, locale))
 
+    log_event("extracted", task="schedule", text=text, fields=details)
     print(f"[Debug] Extracted details: {details}")  # Add this for debugging
     return details
 
-def parse_datetime(date_str, time_range):
+def parse_datetime(date_str, time_range, tz_name=DEFAULT_TIMEZONE, locale=DEFAULT_LOCALE):
     start_time, end_time = time_range.lower().split(" to ")
-    start = dateparser.parse(f"{date_str} {start_time}")
-    end = dateparser.parse(f"{date_str} {end_time}")
+    start = localize(date_str, start_time, tz_name, locale)
+    end = localize(date_str, end_time, tz_name, locale)
+    if start is None or end is None:
+        return None, None
     return start.isoformat(), end.isoformat()
 
 
@@ -432,7 +378,7 @@ def prompt_missing_fields(current_data):
                 else:
                     print("❗ Event name cannot be empty.")
             else:
-                extracted = extract_event_details(reply)
+                extracted = extract_event_details(reply, fields=[field])
                 if field in extracted:
                     current_data[field] = extracted[field]
                     break
@@ -441,36 +387,22 @@ def prompt_missing_fields(current_data):
     return current_data
 
 def is_schedule_intent(message):
-        prompt = f""" Is this message related to scheduling an event or meet (make sure it is not about deletion or cancellation or updation or rescheduling the event or meet) only then Reply with "yes" else "no".
-    Message: "{message}" """
-        intent = chat.send_message(prompt)
-        return "yes" in intent.text.lower()
+    return parse_yes_no(ask("schedule_intent", message=message)) is True
 
 def is_update_intent(message):
-    prompt = f"""Is this message about updating or rescheduling an existing event? Only reply "yes" or "no".
-
-Message: "{message}"
-"""
-    intent = chat.send_message(prompt)
-    return "yes" in intent.text.lower()
+    return parse_yes_no(ask("update_intent", message=message)) is True
 
 
 def is_delete_intent(message):
-    prompt = f"""Is this message about deleting or canceling a calendar event? Reply only with "yes" or "no".
-Message: "{message}" """
-    intent = chat.send_message(prompt)
-    return "yes" in intent.text.lower()
+    return parse_yes_no(ask("delete_intent", message=message)) is True
 
 
 def correct_schedule_spelling(message):
+    # The corrected text replaces the message, so a long one is passed through rather than cut short
+    if not fits_budget("spelling", message=message):
+        return message
 
-    prompt = f"""You are an expert system, so if there is any spelling errors and grammar errors in the user input just correct
-    only it avoid space mistakes and aligning mistakes all and make sure always timing must be in this format example "10am to 11am" 
-    if you find timing in some other format correct them to this format alone and return the error free sentence, incase there is no 
-    error in the user input just return the same sentence.
-    Message: "{message}" """
-    crt = chat.send_message(prompt)
-    corrected_message = crt.candidates[0].content.parts[0].text.strip()
+    corrected_message = ask("spelling", message=message)
     print(corrected_message)
 
     '''corrections = {
@@ -548,8 +480,11 @@ def prompt_for_deletion_details(text):
 if __name__ == "__main__":
     print("🧠 Gemini Assistant: Ready to schedule your meetings. Type 'exit' anytime to quit.")
     services = authenticate_services()
+    current_conversation.set(new_conversation_id())
+    reply_history = []
     while True:
         user_input = input("You: ")
+        log_event("turn", message=user_input)
         user_input = correct_schedule_spelling(user_input)
         print(user_input)
         if user_input.lower() in ["exit", "quit"]:
@@ -560,7 +495,10 @@ if __name__ == "__main__":
             details = extract_event_details(user_input)
             details = prompt_missing_fields(details)
             start_time, end_time = parse_datetime(details['event_date'], details['event_time'])
-            sent_time,mail_check = send_invitation(services['gmail'], details['participant_email'],details["event_date"],details["event_time"])
+            if start_time is None:
+                print("🤖 Gemini: I couldn't read that date and time, please try again.")
+                continue
+            sent_time,mail_check = send_invitation(services['gmail'], details['participant_email'],details["event_date"],details["event_time"], start_time, end_time)
             if wait_for_acceptance(services['gmail'], details['participant_email'], sent_time):
                 create_event(
                     services['calendar'],
@@ -581,6 +519,5 @@ if __name__ == "__main__":
             if not deleted:
                 print("🤖 Gemini: I couldn't find that event in your calendar.")
         else:
-            response = chat.send_message(f"""Reply to the users Message: "{user_input}" """)
-            print(response)
-            print("🤖 Gemini:", response.text)
+            response = ask("reply", history=reply_history, message=user_input)
+            print("🤖 Gemini:", response)
@@ -0,0 +1,178 @@
+import re
+import time
+from string import Formatter
+
+# Rough local tokenizer: words, numbers and single punctuation marks.
+# Gemini's tokenizer splits long words further, so the count is scaled up a bit.
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+TOKENS_PER_WORD = 1.3
+
+# Generation configs per kind of task; answers are constrained so they can be parsed locally
+YES_NO_CONFIG = {
+    "temperature": 0,
+    "max_output_tokens": 3,
+    "response_mime_type": "text/x.enum",
+    "response_schema": {"type": "STRING", "enum": ["yes", "no"]}
+}
+FIELDS_CONFIG = {
+    "temperature": 0,
+    "max_output_tokens": 96,
+    "response_mime_type": "application/json",
+    "response_schema": {
+        "type": "OBJECT",
+        "properties": {
+            "event_name": {"type": "STRING", "nullable": True},
+            "event_date": {"type": "STRING", "nullable": True},
+            "event_time": {"type": "STRING", "nullable": True}
+        }
+    }
+}
+REWRITE_CONFIG = {
+    "temperature": 0,
+    "max_output_tokens": 256
+}
+
+PROMPT_SOURCES = {
+    "extract_fields": {
+        "version": 3,
+        "config": FIELDS_CONFIG,
+        "max_input_tokens": 256,
+        "text": """Extract only these fields from the message: {fields}. Correct spelling errors. Use null for any field the message does not state.
+event_name: the specific name of the event, not a generic word like "meeting"
+event_date: the date as written in the message, e.g. "april 8" or "next friday"
+event_time: the start and end time in this format "3pm to 4pm"
+Message: "{message}" """
+    },
+    "schedule_intent": {
+        "version": 3,
+        "config": YES_NO_CONFIG,
+        "max_input_tokens": 256,
+        "text": """Is this message about scheduling a new event or meet (not deleting, cancelling, updating or rescheduling one)? Reply only "yes" or "no".
+Message: "{message}" """
+    },
+    "update_intent": {
+        "version": 3,
+        "config": YES_NO_CONFIG,
+        "max_input_tokens": 256,
+        "text": """Is this message about updating or rescheduling an existing event? Reply only "yes" or "no".
+Message: "{message}" """
+    },
+    "delete_intent": {
+        "version": 3,
+        "config": YES_NO_CONFIG,
+        "max_input_tokens": 256,
+        "text": """Is this message about deleting or canceling a calendar event? Reply only "yes" or "no".
+Message: "{message}" """
+    },
+    "spelling": {
+        "version": 2,
+        "config": REWRITE_CONFIG,
+        "max_input_tokens": 256,
+        "text": """Correct only the spelling and grammar errors in the message and return the corrected sentence, or the same sentence if there are no errors. Always write timings in this format "10am to 11am".
+Message: "{message}" """
+    },
+    "reply": {
+        "version": 1,
+        "config": None,
+        "max_input_tokens": 512,
+        "text": """Reply to the users Message: "{message}" """
+    }
+}
+
+
+def compile_template(text):
+    # Split once into literal text and field names so rendering is just a join
+    parts = []
+    for literal, field, _, _ in Formatter().parse(text):
+        if literal:
+            parts.append((literal, None))
+        if field is not None:
+            parts.append(("", field))
+    return parts
+
+
+PROMPTS = {
+    name: dict(source, parts=compile_template(source["text"]))
+    for name, source in PROMPT_SOURCES.items()
+}
+
+# Per task usage: calls, estimated input tokens, reported prompt/output tokens and latency
+TOKEN_USAGE = {}
+
+
+def count_tokens(text):
+    return int(len(TOKEN_PATTERN.findall(text)) * TOKENS_PER_WORD + 0.5)
+
+
+def trim_to_budget(text, max_tokens):
+    max_words = int(max_tokens / TOKENS_PER_WORD)
+    for i, match in enumerate(TOKEN_PATTERN.finditer(text)):
+        if i == max_words:
+            return text[:match.start()].rstrip()
+    return text
+
+
+def field_budget(name):
+    prompt = PROMPTS[name]
+    fixed_tokens = count_tokens("".join(literal for literal, _ in prompt["parts"]))
+    return max(prompt["max_input_tokens"] - fixed_tokens, 1)
+
+
+# For prompts whose output replaces the input, trimming would lose text; callers check this first
+def fits_budget(name, **fields):
+    budget = field_budget(name)
+    return all(count_tokens(str(value)) <= budget for value in fields.values())
+
+
+def render_prompt(name, **fields):
+    prompt = PROMPTS[name]
+    budget = field_budget(name)
+    rendered = []
+    for literal, field in prompt["parts"]:
+        if field is None:
+            rendered.append(literal)
+        else:
+            rendered.append(trim_to_budget(str(fields[field]), budget))
+    return "".join(rendered)
+
+
+def record_usage(name, prompt_text, response, started):
+    usage = TOKEN_USAGE.setdefault(name, {
+        "version": PROMPTS[name]["version"],
+        "calls": 0,
+        "estimated_input_tokens": 0,
+        "prompt_tokens": 0,
+        "output_tokens": 0,
+        "latency_ms": 0.0
+    })
+    metadata = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(metadata, "prompt_token_count", 0) or 0
+    output_tokens = getattr(metadata, "candidates_token_count", 0) or 0
+    latency_ms = (time.perf_counter() - started) * 1000
+
+    usage["calls"] += 1
+    usage["estimated_input_tokens"] += count_tokens(prompt_text)
+    usage["prompt_tokens"] += prompt_tokens
+    usage["output_tokens"] += output_tokens
+    usage["latency_ms"] += latency_ms
+    print(f"[Tokens] {name} v{usage['version']}: in={prompt_tokens} out={output_tokens} {latency_ms:.0f}ms")
+    return {
+        "prompt": name,
+        "version": usage["version"],
+        "prompt_tokens": prompt_tokens,
+        "output_tokens": output_tokens,
+        "latency_ms": round(latency_ms, 1)
+    }
+
+
+def token_report():
+    report = {}
+    for name, usage in TOKEN_USAGE.items():
+        calls = usage["calls"] or 1
+        report[name] = dict(
+            usage,
+            avg_prompt_tokens=usage["prompt_tokens"] / calls,
+            avg_output_tokens=usage["output_tokens"] / calls,
+            avg_latency_ms=usage["latency_ms"] / calls
+        )
+    return report
@@ -0,0 +1,129 @@
+import re
+import json
+from datetime import date
+
+from timezones import DEFAULT_TIMEZONE, DEFAULT_LOCALE, now_in, parse_date, parse_clock
+
+YES_NO_PATTERN = re.compile(r"^\W*(yes|no)\b", re.IGNORECASE)
+JSON_OBJECT_PATTERN = re.compile(r"\{.*\}", re.DOTALL)
+TIME_RANGE_PATTERN = re.compile(
+    r"(\d{1,2}(?::\d{2})?\s*(?:am|pm))\s*(?:to|too|till|til|until|-|–)\s*(\d{1,2}(?::\d{2})?\s*(?:am|pm))",
+    re.IGNORECASE
+)
+MONTH_DATE_PATTERN = re.compile(
+    r"\b(jan|feb|mar|apr|aprl|apl|may|jun|jul|aug|sep|sept|oct|nov|dec|january|february|march|april|may|june|"
+    r"july|august|september|october|november|december)\s+\d{1,2}\b"
+)
+RELATIVE_DATE_PATTERN = re.compile(
+    r"\b(today|tomorrow|day after tomorrow|next\s+(?:mon|tues|wednes|thurs|fri|satur|sun)day|"
+    r"(?:mon|tues|wednes|thurs|fri|satur|sun)day)\b"
+)
+ISO_DATE_PATTERN = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+# Spellings the month pattern accepts but dateparser doesn't
+MONTH_ALIASES = {"aprl": "apr", "apl": "apr"}
+
+# Answers the model gives when there is no real event name
+GENERIC_NAMES = {
+    "", "none", "null", "n/a", "na", "unknown", "not specified", "no event name", "event", "meeting",
+    "meet", "the event", "the meeting", "an event", "a meeting", "calendar event"
+}
+
+
+# "Yes.", "yes, it is" -> True; "No, yes..." -> False; anything else -> None
+def parse_yes_no(text):
+    match = YES_NO_PATTERN.match(text or "")
+    if not match:
+        return None
+    return match.group(1).lower() == "yes"
+
+
+def parse_json_object(text):
+    try:
+        value = json.loads(text)
+    except (TypeError, ValueError):
+        match = JSON_OBJECT_PATTERN.search(text or "")
+        if not match:
+            return {}
+        try:
+            value = json.loads(match.group(0))
+        except ValueError:
+            return {}
+    return value if isinstance(value, dict) else {}
+
+
+# Both ends must be real clock times and the range has to end after it starts
+def is_valid_range(start, end):
+    start, end = parse_clock(start), parse_clock(end)
+    return start is not None and end is not None and end > start
+
+
+# With unique=True a message naming several ranges ("from 3pm to 4pm to 5pm to 6pm") is left to the model
+def find_time_range(text, unique=False):
+    matches = []
+    for match in TIME_RANGE_PATTERN.finditer(text or ""):
+        start, end = (re.sub(r"\s+", "", part.lower()) for part in match.groups())
+        if is_valid_range(start, end):
+            matches.append((start, end))
+    if not matches or (unique and len(matches) > 1):
+        return None
+    start, end = matches[0]
+    return f"{start} to {end}"
+
+
+# A resolved date, as YYYY-MM-DD, only if it is real and not already past
+def upcoming_date(day, tz_name):
+    if day is None or day < now_in(tz_name).date():
+        return None
+    return day.strftime('%Y-%m-%d')
+
+
+# With unique=True a message naming several dates ("from april 3 to april 5") is left to the model
+def find_date(text, tz_name=DEFAULT_TIMEZONE, locale=DEFAULT_LOCALE, unique=False):
+    text_lower = (text or "").lower()
+    # The first date named in the message wins, whichever pattern found it
+    matches = sorted((match for pattern in (ISO_DATE_PATTERN, MONTH_DATE_PATTERN, RELATIVE_DATE_PATTERN)
+                      for match in pattern.finditer(text_lower)), key=lambda match: match.start())
+    if not matches or (unique and len(matches) > 1):
+        return None
+    match = matches[0]
+    date_text = match.group(0)
+    if match.re is ISO_DATE_PATTERN:
+        try:
+            return upcoming_date(date.fromisoformat(date_text), tz_name)
+        except ValueError:
+            return None
+    if date_text == "today":
+        return now_in(tz_name).strftime('%Y-%m-%d')
+    # With future dates preferred a bare weekday already means the next one
+    date_text = re.sub(r"^next\s+", "", date_text)
+    month, _, day = date_text.partition(" ")
+    if month in MONTH_ALIASES:
+        date_text = f"{MONTH_ALIASES[month]} {day}"
+    parsed = parse_date(date_text, tz_name, locale)
+    return upcoming_date(parsed.date() if parsed else None, tz_name)
+
+
+# Validators for values the model extracted: normalized value, or None if it doesn't hold up
+def validate_date(value, tz_name=DEFAULT_TIMEZONE, locale=DEFAULT_LOCALE):
+    if not isinstance(value, str) or value.strip().lower() in GENERIC_NAMES:
+        return None
+    found = find_date(value, tz_name, locale)
+    if found:
+        return found
+    parsed = parse_date(value, tz_name, locale)
+    return upcoming_date(parsed.date() if parsed else None, tz_name)
+
+
+def validate_time_range(value):
+    if not isinstance(value, str):
+        return None
+    return find_time_range(value)
+
+
+def validate_event_name(value):
+    if not isinstance(value, str):
+        return None
+    name = value.strip().strip("\"'").strip()
+    if name.lower() in GENERIC_NAMES or len(name) > 100:
+        return None
+    return name
@@ -0,0 +1,269 @@
+import os
+import json
+import time
+import random
+import argparse
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+
+from timezones import DEFAULT_TIMEZONE, get_zone
+
+load_dotenv()
+
+SLOT_MINUTES = 15
+HORIZON_DAYS = 28
+MAX_PROPOSALS = 3
+POLICIES_PATH = os.environ.get("SCHEDULING_POLICIES_PATH", "scheduling_policies.json")
+
+DEFAULT_POLICY = {
+    "timezone": DEFAULT_TIMEZONE,
+    "working_hours": ["09:00", "18:00"],
+    "working_days": [0, 1, 2, 3, 4],
+    "buffer_minutes": 10,
+    "max_meetings_per_day": 6,
+    "preferred_windows": [["10:00", "12:00"], ["14:00", "17:00"]]
+}
+
+
+# Per-attendee policies from a JSON file keyed by email, with an optional "default" entry
+def load_policies(path=POLICIES_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+POLICIES = load_policies()
+
+
+def policy_for(email, policies=None):
+    policies = POLICIES if policies is None else policies
+    policy = dict(DEFAULT_POLICY, **policies.get("default", {}))
+    policy.update(policies.get(email.lower(), {}))
+    return policy
+
+
+def to_minutes(clock):
+    hours, minutes = clock.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def span_mask(start, end):
+    if end <= start:
+        return 0
+    return ((1 << (end - start)) - 1) << start
+
+
+# Starts from which `length` consecutive slots are all set
+def run_starts(mask, length):
+    run = mask
+    for k in range(1, length):
+        run &= mask >> k
+    return run
+
+
+def iter_bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class Grid:
+    """Fixed-size UTC time grid; bit i of a mask is the slot starting at origin + i * SLOT_MINUTES."""
+
+    def __init__(self, origin, days=HORIZON_DAYS, slot_minutes=SLOT_MINUTES):
+        seconds = slot_minutes * 60
+        origin = origin.astimezone(timezone.utc)
+        self.origin_ts = -(-int(origin.timestamp()) // seconds) * seconds
+        self.origin = datetime.fromtimestamp(self.origin_ts, timezone.utc)
+        self.slot_seconds = seconds
+        self.slots = days * 24 * 60 // slot_minutes
+        self.days = days
+
+    def index(self, moment, round_up=False):
+        offset = moment.timestamp() - self.origin_ts
+        slot = -(-offset // self.slot_seconds) if round_up else offset // self.slot_seconds
+        return int(min(max(slot, 0), self.slots))
+
+    def moment(self, index):
+        return self.origin + timedelta(seconds=index * self.slot_seconds)
+
+    # Busy time covers every slot it touches; free time only the slots fully inside it
+    def interval_mask(self, start, end, inside=False):
+        if inside:
+            return span_mask(self.index(start, round_up=True), self.index(end))
+        return span_mask(self.index(start), self.index(end, round_up=True))
+
+    def local_days(self, tz_name):
+        zone = get_zone(tz_name)
+        day = self.origin.astimezone(zone).date()
+        for _ in range(self.days + 1):
+            yield day, zone
+            day += timedelta(days=1)
+
+    def daily_mask(self, tz_name, windows, weekdays=None):
+        return _daily_mask(self.origin_ts, self.slots, self.slot_seconds, self.days, tz_name,
+                           tuple(tuple(window) for window in windows),
+                           tuple(weekdays) if weekdays is not None else None)
+
+
+# Working-hour and preferred-window masks only depend on the grid and the policy, so they are shared
+@lru_cache(maxsize=1024)
+def _daily_mask(origin_ts, slots, slot_seconds, days, tz_name, windows, weekdays):
+    grid = Grid(datetime.fromtimestamp(origin_ts, timezone.utc), days, slot_seconds // 60)
+    minutes = [(to_minutes(start), to_minutes(end)) for start, end in windows]
+    mask = 0
+    for day, zone in grid.local_days(tz_name):
+        if weekdays is not None and day.weekday() not in weekdays:
+            continue
+        midnight = datetime(day.year, day.month, day.day, tzinfo=zone)
+        for start, end in minutes:
+            mask |= grid.interval_mask(midnight + timedelta(minutes=start), midnight + timedelta(minutes=end), inside=True)
+    return mask
+
+
+def attendee_free_mask(grid, policy, busy):
+    free = grid.daily_mask(policy["timezone"], [policy["working_hours"]], policy["working_days"])
+    buffer = timedelta(minutes=policy["buffer_minutes"])
+    zone = get_zone(policy["timezone"])
+    per_day = {}
+    for start, end in busy:
+        free &= ~grid.interval_mask(start - buffer, end + buffer)
+        day = start.astimezone(zone).date()
+        per_day[day] = per_day.get(day, 0) + 1
+
+    for day, count in per_day.items():
+        if count >= policy["max_meetings_per_day"]:
+            midnight = datetime(day.year, day.month, day.day, tzinfo=zone)
+            free &= ~grid.interval_mask(midnight, midnight + timedelta(days=1))
+    return free
+
+
+def find_slots(attendees, duration, requested_start=None, origin=None, days=HORIZON_DAYS,
+               limit=MAX_PROPOSALS, policies=None, tz_name=DEFAULT_TIMEZONE):
+    """Best meeting starts for everyone in `attendees` ({email: [(start, end), ...] busy intervals}).
+
+    Candidates must fit every attendee's working hours, buffers and daily meeting cap; they are
+    ranked by how many attendees get the slot inside a preferred window, then by closeness to
+    `requested_start`, keeping at most one proposal per calendar day in `tz_name`.
+    """
+    origin = origin or datetime.now(timezone.utc)
+    grid = Grid(origin, days)
+    length = max(1, -(-int(duration.total_seconds()) // grid.slot_seconds))
+
+    common = span_mask(0, grid.slots)
+    preferred = []
+    for email, busy in attendees.items():
+        policy = policy_for(email, policies)
+        common &= attendee_free_mask(grid, policy, busy)
+        if not common:
+            return []
+        preferred.append(run_starts(grid.daily_mask(policy["timezone"], policy["preferred_windows"]), length))
+
+    starts = run_starts(common, length)
+    target = grid.index(requested_start) if requested_start else 0
+
+    zone = get_zone(tz_name)
+    best_per_day = {}
+    for index in iter_bits(starts):
+        score = (-sum(mask >> index & 1 for mask in preferred), abs(index - target))
+        day = grid.moment(index).astimezone(zone).date()
+        if day not in best_per_day or score < best_per_day[day][0]:
+            best_per_day[day] = (score, index)
+
+    ranked = sorted(best_per_day.values())[:limit]
+    return [(grid.moment(index), grid.moment(index + length)) for _, index in ranked]
+
+
+def parse_rfc3339(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+# Busy intervals from the Calendar free/busy API; calendars we can't see count as free
+def fetch_busy(calendar_service, emails, start, end):
+    busy = {email: [] for email in emails}
+    emails = list(emails)
+    for i in range(0, len(emails), 50):
+        result = calendar_service.freebusy().query(body={
+            "timeMin": start.isoformat(),
+            "timeMax": end.isoformat(),
+            "items": [{"id": email} for email in emails[i:i + 50]]
+        }).execute()
+        for email, calendar in result.get("calendars", {}).items():
+            if email in busy:
+                busy[email] = [(parse_rfc3339(b["start"]), parse_rfc3339(b["end"])) for b in calendar.get("busy", [])]
+    return busy
+
+
+# Ranked replacement slots after a rejection; the organizer's own calendar is "primary" in their zone
+def propose_alternatives(calendar_service, participant_emails, start_iso, end_iso, organizer_timezone=DEFAULT_TIMEZONE,
+                         limit=MAX_PROPOSALS):
+    start = datetime.fromisoformat(start_iso)
+    end = datetime.fromisoformat(end_iso)
+    origin = datetime.now(timezone.utc)
+    emails = ["primary"] + list(participant_emails)
+    busy = fetch_busy(calendar_service, emails, origin, origin + timedelta(days=HORIZON_DAYS))
+    # The rejected slot itself is off the table
+    for email in participant_emails:
+        busy[email].append((start, end))
+    # Without a policy of their own, attendees are assumed to keep the organizer's hours in the organizer's zone
+    policies = dict(
+        POLICIES,
+        default=dict({"timezone": organizer_timezone}, **POLICIES.get("default", {})),
+        primary=dict({"timezone": organizer_timezone}, **POLICIES.get("primary", {}))
+    )
+    return find_slots(busy, end - start, requested_start=start, origin=origin, limit=limit, policies=policies,
+                      tz_name=organizer_timezone)
+
+
+def format_clock(moment):
+    return moment.strftime("%I:%M%p").lstrip("0").replace(":00", "").lower()
+
+
+# Back to the chat's own fields: ("2026-04-08", "10:30am to 11am") in the user's zone
+def slot_fields(start, end, tz_name=DEFAULT_TIMEZONE):
+    zone = get_zone(tz_name)
+    start, end = start.astimezone(zone), end.astimezone(zone)
+    return start.strftime("%Y-%m-%d"), f"{format_clock(start)} to {format_clock(end)}"
+
+
+def benchmark(attendee_count=30, days=HORIZON_DAYS, meetings_per_day=1, runs=20):
+    rng = random.Random(7)
+    origin = datetime.now(timezone.utc)
+    zones = ["Asia/Kolkata", "Europe/London", "Europe/Berlin"]
+    policies = {}
+    attendees = {}
+    for n in range(attendee_count):
+        email = f"user{n}@example.com"
+        policies[email] = {"timezone": zones[n % len(zones)]}
+        zone = get_zone(policies[email]["timezone"])
+        busy = []
+        # Meetings land inside the attendee's own 09:00-18:00
+        for day, _ in Grid(origin, days).local_days(policies[email]["timezone"]):
+            for _ in range(meetings_per_day):
+                start = datetime(day.year, day.month, day.day, 9, tzinfo=zone) + timedelta(minutes=rng.randrange(0, 8 * 60, 30))
+                busy.append((start, start + timedelta(minutes=rng.choice([30, 60]))))
+        attendees[email] = busy
+
+    timings = []
+    for _ in range(runs):
+        _daily_mask.cache_clear()
+        started = time.perf_counter()
+        slots = find_slots(attendees, timedelta(minutes=30), origin=origin, days=days, policies=policies)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    print(f"{attendee_count} attendees, {days} days: median {timings[len(timings) // 2]:.1f}ms, "
+          f"max {timings[-1]:.1f}ms, {len(slots)} proposals")
+    for start, end in slots:
+        print(f"  {start.isoformat()} → {end.isoformat()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark meeting placement")
+    parser.add_argument("--attendees", type=int, default=30)
+    parser.add_argument("--days", type=int, default=HORIZON_DAYS)
+    parser.add_argument("--meetings-per-day", type=int, default=1)
+    args = parser.parse_args()
+    benchmark(args.attendees, args.days, args.meetings_per_day)
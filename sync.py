@@ -0,0 +1,648 @@
+import os
+import json
+import hmac
+import time
+import uuid
+import base64
+import random
+import hashlib
+import sqlite3
+import argparse
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+from flask import Flask, request
+from google.auth.exceptions import RefreshError
+from googleapiclient.errors import HttpError
+
+from auditlog import log_event
+from tenants import get_services
+
+load_dotenv()
+
+WEBHOOK_BASE_URL = os.environ.get("WEBHOOK_BASE_URL")
+GMAIL_PUBSUB_TOPIC = os.environ.get("GMAIL_PUBSUB_TOPIC")
+WEBHOOK_SECRET = (os.environ.get("WEBHOOK_SECRET") or os.environ.get("FLASK_SECRET_KEY") or "").encode()
+CHANNEL_TTL = 7 * 86400
+RENEW_MARGIN = 3600
+RENEW_CHECK_INTERVAL = 300
+WATCH_RETRY_INTERVAL = 3600
+# How long a worker may hold a watch setup or renewal before another one may take over
+CLAIM_SECONDS = 600
+# Another worker may take the Gmail push, so waiters also re-read the store this often
+MAIL_POLL_INTERVAL = 2.0
+
+# Per-process counters; channels, sync tokens, cached events and mailboxes live in the sync database
+stats = {"notifications": 0, "syncs": 0, "api_calls": 0, "changes": 0}
+
+_sync_locks = {}
+_pending = set()
+_mail_arrived = threading.Condition()
+_watch_failures = {}
+_renewer = None
+_state_lock = threading.Lock()
+_local = threading.local()
+
+
+def connect(path=None):
+    conn = sqlite3.connect(path or os.environ.get("SYNC_DB_PATH", "sync.db"), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS channels (
+            id TEXT PRIMARY KEY,
+            user TEXT NOT NULL,
+            resource_id TEXT NOT NULL,
+            expiration REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS channels_user ON channels (user, expiration);
+        CREATE TABLE IF NOT EXISTS calendars (
+            user TEXT PRIMARY KEY,
+            sync_token TEXT,
+            synced_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS events (
+            user TEXT NOT NULL,
+            id TEXT NOT NULL,
+            start REAL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (user, id)
+        );
+        CREATE INDEX IF NOT EXISTS events_start ON events (user, start);
+        CREATE TABLE IF NOT EXISTS mailboxes (
+            user TEXT PRIMARY KEY,
+            history_id INTEGER NOT NULL,
+            expiration REAL NOT NULL,
+            seq INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS claims (
+            key TEXT PRIMARY KEY,
+            until REAL NOT NULL
+        );
+    """)
+    return conn
+
+
+# One connection per thread and database path; every worker process shares the same file
+def db():
+    path = os.environ.get("SYNC_DB_PATH", "sync.db")
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    if path not in conns:
+        conns[path] = connect(path)
+    return conns[path]
+
+
+# Take a lease on `key` for CLAIM_SECONDS; False while another worker (or thread) holds it
+def claim(key, seconds=CLAIM_SECONDS):
+    now = time.time()
+    with db() as conn:
+        conn.execute("INSERT OR IGNORE INTO claims (key, until) VALUES (?, 0)", (key,))
+        return conn.execute("UPDATE claims SET until = ? WHERE key = ? AND until < ?",
+                            (now + seconds, key, now)).rowcount == 1
+
+
+def release(key):
+    with db() as conn:
+        conn.execute("DELETE FROM claims WHERE key = ?", (key,))
+
+
+def sign(value):
+    return hmac.new(WEBHOOK_SECRET, value.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def channel_token(channel_id, user):
+    return f"{user}|{sign(channel_id + user)}"
+
+
+def verify_channel_token(channel_id, token):
+    user, _, signature = (token or "").rpartition("|")
+    if user and hmac.compare_digest(signature, sign(channel_id + user)):
+        return user
+    return None
+
+
+# Appended as ?token= to the Pub/Sub push subscription's endpoint URL; None when nothing can vouch for a push
+def gmail_push_token():
+    if os.environ.get("GMAIL_PUSH_TOKEN"):
+        return os.environ["GMAIL_PUSH_TOKEN"]
+    return sign("gmail-push") if WEBHOOK_SECRET else None
+
+
+def count_call(result):
+    stats["api_calls"] += 1
+    return result
+
+
+def event_start(event):
+    start = event.get('start', {})
+    if 'dateTime' in start:
+        return datetime.fromisoformat(start['dateTime'].replace("Z", "+00:00"))
+    return datetime.fromisoformat(start['date']).replace(tzinfo=timezone.utc)
+
+
+def event_row(user, event):
+    start = event_start(event).timestamp() if event.get('start') else None
+    return (user, event['id'], start, json.dumps(event, separators=(",", ":")))
+
+
+def full_calendar_sync(user, calendar_service):
+    events = []
+    page_token = None
+    while True:
+        result = count_call(calendar_service.events().list(
+            calendarId='primary', singleEvents=True, maxResults=2500, pageToken=page_token
+        ).execute())
+        events.extend(result.get('items', []))
+        page_token = result.get('nextPageToken')
+        if not page_token:
+            break
+    with db() as conn:
+        conn.execute("DELETE FROM events WHERE user = ?", (user,))
+        conn.executemany("INSERT OR REPLACE INTO events (user, id, start, data) VALUES (?, ?, ?, ?)",
+                         [event_row(user, event) for event in events])
+        conn.execute("INSERT OR REPLACE INTO calendars (user, sync_token, synced_at) VALUES (?, ?, ?)",
+                     (user, result.get('nextSyncToken'), time.time()))
+    return len(events)
+
+
+# Pull only what changed since the last sync token; a 410 means the token expired
+def incremental_calendar_sync(user, calendar_service):
+    row = db().execute("SELECT sync_token FROM calendars WHERE user = ?", (user,)).fetchone()
+    if not row or not row[0]:
+        return full_calendar_sync(user, calendar_service)
+    sync_token = row[0]
+    changed = []
+    page_token = None
+    while True:
+        try:
+            result = count_call(calendar_service.events().list(
+                calendarId='primary', singleEvents=True, syncToken=sync_token, pageToken=page_token
+            ).execute())
+        except HttpError as e:
+            if e.resp.status == 410:
+                return full_calendar_sync(user, calendar_service)
+            raise
+        changed.extend(result.get('items', []))
+        page_token = result.get('nextPageToken')
+        if not page_token:
+            break
+    with db() as conn:
+        for event in changed:
+            if event.get('status') == 'cancelled':
+                conn.execute("DELETE FROM events WHERE user = ? AND id = ?", (user, event['id']))
+            else:
+                conn.execute("INSERT OR REPLACE INTO events (user, id, start, data) VALUES (?, ?, ?, ?)",
+                             event_row(user, event))
+        conn.execute("UPDATE calendars SET sync_token = ?, synced_at = ? WHERE user = ?",
+                     (result.get('nextSyncToken', sync_token), time.time(), user))
+    return len(changed)
+
+
+# Notifications that arrive while a sync runs are folded into one more pass instead of queuing.
+# Workers in other processes may sync the same user concurrently; the writes are idempotent upserts.
+def sync_calendar(user, calendar_service):
+    with _state_lock:
+        lock = _sync_locks.setdefault(user, threading.Lock())
+        _pending.add(user)
+    if not lock.acquire(blocking=False):
+        return 0
+    changed = 0
+    try:
+        while user in _pending:
+            _pending.discard(user)
+            changed += incremental_calendar_sync(user, calendar_service)
+            stats["syncs"] += 1
+    finally:
+        lock.release()
+    stats["changes"] += changed
+    if user in _pending:
+        changed += sync_calendar(user, calendar_service)
+    return changed
+
+
+def is_watching_calendar(user):
+    return db().execute("SELECT 1 FROM channels WHERE user = ? AND expiration > ?", (user, time.time())).fetchone() is not None
+
+
+# Upcoming events from the pushed cache, or None when the cache isn't being kept fresh
+def upcoming_events(user):
+    if not user or not is_watching_calendar(user):
+        return None
+    if db().execute("SELECT 1 FROM calendars WHERE user = ?", (user,)).fetchone() is None:
+        return None
+    rows = db().execute("SELECT data FROM events WHERE user = ? AND start >= ? ORDER BY start",
+                        (user, time.time())).fetchall()
+    return [json.loads(data) for data, in rows]
+
+
+def watch_calendar(user, calendar_service):
+    channel_id = uuid.uuid4().hex
+    result = count_call(calendar_service.events().watch(calendarId='primary', body={
+        "id": channel_id,
+        "type": "web_hook",
+        "address": f"{WEBHOOK_BASE_URL}/webhooks/calendar",
+        "token": channel_token(channel_id, user),
+        "params": {"ttl": str(CHANNEL_TTL)}
+    }).execute())
+    expiration = int(result.get("expiration", (time.time() + CHANNEL_TTL) * 1000)) / 1000
+    with db() as conn:
+        conn.execute("INSERT INTO channels (id, user, resource_id, expiration) VALUES (?, ?, ?, ?)",
+                     (channel_id, user, result["resourceId"], expiration))
+    log_event("google", action="watch_calendar", user=user, channel=channel_id)
+    return channel_id
+
+
+def stop_channel(channel_id, calendar_service):
+    row = db().execute("SELECT resource_id FROM channels WHERE id = ?", (channel_id,)).fetchone()
+    if row is None:
+        return
+    with db() as conn:
+        conn.execute("DELETE FROM channels WHERE id = ?", (channel_id,))
+    try:
+        count_call(calendar_service.channels().stop(body={"id": channel_id, "resourceId": row[0]}).execute())
+    except HttpError as e:
+        print(f"❗ Couldn't stop channel {channel_id}: {e}")
+
+
+def watch_gmail(user, gmail_service):
+    result = count_call(gmail_service.users().watch(userId='me', body={
+        "topicName": GMAIL_PUBSUB_TOPIC,
+        "labelIds": ["INBOX"]
+    }).execute())
+    # A renewal keeps the history id and sequence already reached
+    with db() as conn:
+        conn.execute("""INSERT INTO mailboxes (user, history_id, expiration) VALUES (?, ?, ?)
+            ON CONFLICT (user) DO UPDATE SET expiration = excluded.expiration""",
+                     (user, int(result["historyId"]), int(result["expiration"]) / 1000))
+    log_event("google", action="watch_gmail", user=user)
+
+
+def mailbox(user):
+    row = db().execute("SELECT history_id, expiration, seq FROM mailboxes WHERE user = ?", (user,)).fetchone()
+    if row is None:
+        return None
+    return {"history_id": row[0], "expiration": row[1], "seq": row[2]}
+
+
+def mail_sequence(user):
+    box = mailbox(user)
+    if box is None or box["expiration"] < time.time():
+        return None
+    return box["seq"]
+
+
+# Block until a Gmail notification newer than `seen` arrives for the user, or the timeout passes.
+# Pushes handled in this process wake the waiter at once; the others are seen on the next poll.
+def wait_for_mail(user, seen, timeout):
+    deadline = time.monotonic() + timeout
+    with _mail_arrived:
+        while True:
+            box = mailbox(user)
+            if box is not None and box["seq"] > seen:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            _mail_arrived.wait(min(remaining, MAIL_POLL_INTERVAL))
+
+
+def is_watching(user):
+    return is_watching_calendar(user) and (not GMAIL_PUBSUB_TOPIC or mail_sequence(user) is not None)
+
+
+def _start_watching(user, services):
+    try:
+        if not is_watching_calendar(user):
+            full_calendar_sync(user, services['calendar'])
+            watch_calendar(user, services['calendar'])
+        if GMAIL_PUBSUB_TOPIC and mail_sequence(user) is None:
+            watch_gmail(user, services['gmail'])
+    except HttpError as e:
+        print(f"❗ Couldn't start push notifications for {user}: {e}")
+        _watch_failures[user] = time.time()
+    finally:
+        release("watch:" + user)
+
+
+# The first full sync can take a while, so it runs off the request; until it is done the
+# callers simply fall back to live API calls. Pushes are never set up without a secret to sign them.
+def ensure_watching(user, services):
+    if not WEBHOOK_BASE_URL or not WEBHOOK_SECRET:
+        return False
+    if time.time() - _watch_failures.get(user, 0) < WATCH_RETRY_INTERVAL:
+        return False
+    start_renewer()
+    if is_watching(user):
+        return True
+    if claim("watch:" + user):
+        threading.Thread(target=_start_watching, args=(user, services), name="watch-setup", daemon=True).start()
+    return False
+
+
+def renew_expiring(services_for=get_services):
+    soon = time.time() + RENEW_MARGIN
+    for channel_id, user in db().execute("SELECT id, user FROM channels WHERE expiration < ?", (soon,)).fetchall():
+        if not claim("renew:" + channel_id):
+            continue
+        services = services_for(user)
+        if services is None:
+            with db() as conn:
+                conn.execute("DELETE FROM channels WHERE id = ?", (channel_id,))
+            continue
+        watch_calendar(user, services['calendar'])
+        stop_channel(channel_id, services['calendar'])
+        release("renew:" + channel_id)
+    for user, in db().execute("SELECT user FROM mailboxes WHERE expiration < ?", (soon,)).fetchall():
+        if not claim("renew-gmail:" + user):
+            continue
+        services = services_for(user)
+        if services is None:
+            with db() as conn:
+                conn.execute("DELETE FROM mailboxes WHERE user = ?", (user,))
+            continue
+        watch_gmail(user, services['gmail'])
+        release("renew-gmail:" + user)
+
+
+def _renew_loop():
+    while True:
+        time.sleep(RENEW_CHECK_INTERVAL)
+        try:
+            renew_expiring()
+        except (HttpError, RefreshError, sqlite3.Error) as e:
+            print(f"❗ Channel renewal failed: {e}")
+
+
+def start_renewer():
+    global _renewer
+    with _state_lock:
+        if _renewer is not None:
+            return
+        _renewer = threading.Thread(target=_renew_loop, name="channel-renewer", daemon=True)
+    _renewer.start()
+
+
+# On startup, keep renewing the watches earlier processes set up
+def resume_watching():
+    if not WEBHOOK_BASE_URL or not WEBHOOK_SECRET:
+        return
+    if db().execute("SELECT 1 FROM channels UNION ALL SELECT 1 FROM mailboxes LIMIT 1").fetchone():
+        start_renewer()
+
+
+# Returns the HTTP status for the push endpoint
+def handle_calendar_notification(headers, services_for=get_services):
+    if not WEBHOOK_SECRET:
+        return 503
+    channel_id = headers.get("X-Goog-Channel-ID")
+    row = db().execute("SELECT user FROM channels WHERE id = ?", (channel_id,)).fetchone()
+    if row is None:
+        return 404
+    user = row[0]
+    if verify_channel_token(channel_id, headers.get("X-Goog-Channel-Token")) != user:
+        return 403
+    stats["notifications"] += 1
+    if headers.get("X-Goog-Resource-State") == "sync":
+        return 200
+    services = services_for(user)
+    if services is None:
+        return 200
+    sync_calendar(user, services['calendar'])
+    return 200
+
+
+def handle_gmail_notification(payload, token, services_for=get_services):
+    expected = gmail_push_token()
+    if expected is None:
+        return 503
+    if not token or not hmac.compare_digest(token, expected):
+        return 403
+    try:
+        data = json.loads(base64.b64decode(payload["message"]["data"]))
+    except (KeyError, TypeError, ValueError):
+        return 400
+    user = data.get("emailAddress", "").lower()
+    box = mailbox(user)
+    if box is None:
+        return 200
+    stats["notifications"] += 1
+    services = services_for(user)
+    if services is None:
+        return 200
+
+    added = 0
+    page_token = None
+    while True:
+        result = count_call(services['gmail'].users().history().list(
+            userId='me', startHistoryId=box["history_id"], historyTypes=["messageAdded"], pageToken=page_token
+        ).execute())
+        added += sum(len(h.get("messagesAdded", [])) for h in result.get("history", []))
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            break
+    history_id = int(result.get("historyId", data.get("historyId", 0)))
+    with db() as conn:
+        conn.execute("UPDATE mailboxes SET history_id = MAX(history_id, ?), seq = seq + ? WHERE user = ?",
+                     (history_id, 1 if added else 0, user))
+    if added:
+        with _mail_arrived:
+            _mail_arrived.notify_all()
+    stats["changes"] += added
+    return 200
+
+
+def register_webhooks(app, services_for=get_services):
+    @app.route('/webhooks/calendar', methods=['POST'])
+    def calendar_webhook():
+        return "", handle_calendar_notification(request.headers, services_for)
+
+    @app.route('/webhooks/gmail', methods=['POST'])
+    def gmail_webhook():
+        return "", handle_gmail_notification(request.get_json(silent=True) or {}, request.args.get("token"), services_for)
+
+
+# Counts only: who is being watched is nobody else's business
+def sync_report():
+    conn = db()
+    return dict(
+        stats,
+        watched_calendars=conn.execute("SELECT COUNT(DISTINCT user) FROM channels WHERE expiration > ?",
+                                       (time.time(),)).fetchone()[0],
+        watched_mailboxes=conn.execute("SELECT COUNT(*) FROM mailboxes WHERE expiration > ?",
+                                       (time.time(),)).fetchone()[0],
+        cached_events=conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+    )
+
+
+class FakeRequest:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+
+class FakeCalendar:
+    """In-memory stand-in for the Calendar API that supports sync tokens, for the simulator."""
+
+    def __init__(self, event_count):
+        self.version = 0
+        self.store = {}
+        self.calls = 0
+        for n in range(event_count):
+            self.change(f"event{n}")
+
+    def change(self, event_id, cancelled=False):
+        self.version += 1
+        start = datetime.now(timezone.utc) + timedelta(days=random.randint(0, 27), hours=random.randint(0, 23))
+        self.store[event_id] = {
+            "id": event_id,
+            "summary": f"Meeting {event_id}",
+            "status": "cancelled" if cancelled else "confirmed",
+            "start": {"dateTime": start.isoformat()},
+            "end": {"dateTime": (start + timedelta(hours=1)).isoformat()},
+            "_version": self.version
+        }
+
+    def events(self):
+        return self
+
+    def channels(self):
+        return self
+
+    def list(self, syncToken=None, **kwargs):
+        self.calls += 1
+        since = int(syncToken or 0)
+        items = [e for e in self.store.values() if e["_version"] > since and (since or e["status"] != "cancelled")]
+        return FakeRequest({"items": items, "nextSyncToken": str(self.version)})
+
+    def watch(self, calendarId, body):
+        self.calls += 1
+        return FakeRequest({"resourceId": "fake-resource", "expiration": str(int((time.time() + CHANNEL_TTL) * 1000))})
+
+    def stop(self, body):
+        self.calls += 1
+        return FakeRequest({})
+
+
+class FakeGmail:
+    """In-memory stand-in for the Gmail watch and history APIs, for the simulator."""
+
+    def __init__(self):
+        self.history_id = 1
+        self.added = []
+        self.calls = 0
+
+    def receive(self):
+        self.history_id += 1
+        self.added.append(self.history_id)
+
+    def users(self):
+        return self
+
+    def history(self):
+        return self
+
+    def watch(self, userId, body):
+        self.calls += 1
+        expiration = int((time.time() + CHANNEL_TTL) * 1000)
+        return FakeRequest({"historyId": str(self.history_id), "expiration": str(expiration)})
+
+    def list(self, userId, startHistoryId, **kwargs):
+        self.calls += 1
+        history = [{"id": str(h), "messagesAdded": [{"message": {"id": f"message{h}"}}]}
+                   for h in self.added if h > int(startHistoryId)]
+        return FakeRequest({"history": history, "historyId": str(self.history_id)})
+
+
+def simulate(changes=30, duration=3600, delivery_delay=1.0, poll_interval=60, event_count=500, mails=10):
+    """Replays `changes` calendar edits and `mails` incoming messages spread over `duration` simulated seconds,
+    POSTing each notification to the webhook routes, and compares freshness latency and API calls with
+    polling every `poll_interval` seconds."""
+    global WEBHOOK_BASE_URL, WEBHOOK_SECRET, GMAIL_PUBSUB_TOPIC
+    # Scratch databases, so simulated channels and audit events never reach the real ones
+    scratch = tempfile.mkdtemp(prefix="sync-simulator-")
+    os.environ["SYNC_DB_PATH"] = os.path.join(scratch, "sync.db")
+    os.environ["AUDIT_DB_PATH"] = os.path.join(scratch, "audit.db")
+    WEBHOOK_BASE_URL = WEBHOOK_BASE_URL or "https://simulator.invalid"
+    WEBHOOK_SECRET = WEBHOOK_SECRET or uuid.uuid4().hex.encode()
+    GMAIL_PUBSUB_TOPIC = GMAIL_PUBSUB_TOPIC or "projects/simulator/topics/gmail-push"
+
+    user = "simulator@example.com"
+    calendar = FakeCalendar(event_count)
+    gmail = FakeGmail()
+    services = {"calendar": calendar, "gmail": gmail}
+    app = Flask(__name__)
+    register_webhooks(app, lambda _: services)
+    client = app.test_client()
+
+    full_calendar_sync(user, calendar)
+    channel_id = watch_calendar(user, calendar)
+    watch_gmail(user, gmail)
+    headers = {
+        "X-Goog-Channel-ID": channel_id,
+        "X-Goog-Channel-Token": channel_token(channel_id, user),
+        "X-Goog-Resource-State": "sync"
+    }
+    assert client.post("/webhooks/calendar", headers=headers).status_code == 200
+    headers["X-Goog-Resource-State"] = "exists"
+
+    change_times = sorted(random.uniform(0, duration) for _ in range(changes))
+    push_latencies = []
+    for n, changed_at in enumerate(change_times):
+        event_id = f"event{random.randrange(event_count + n)}"
+        calendar.change(event_id, cancelled=random.random() < 0.1)
+        started = time.perf_counter()
+        assert client.post("/webhooks/calendar", headers=headers).status_code == 200
+        processing = time.perf_counter() - started
+        row = db().execute("SELECT data FROM events WHERE user = ? AND id = ?", (user, event_id)).fetchone()
+        expected = calendar.store[event_id]
+        if expected["status"] == "cancelled":
+            assert row is None
+        else:
+            assert json.loads(row[0])["_version"] == expected["_version"]
+        push_latencies.append(delivery_delay + processing)
+
+    mail_times = sorted(random.uniform(0, duration) for _ in range(mails))
+    mail_latencies = []
+    gmail_calls = gmail.calls
+    for _ in mail_times:
+        seen = mail_sequence(user)
+        gmail.receive()
+        payload = {"message": {"data": base64.b64encode(json.dumps(
+            {"emailAddress": user, "historyId": gmail.history_id}).encode()).decode()}}
+        started = time.perf_counter()
+        response = client.post(f"/webhooks/gmail?token={gmail_push_token()}", json=payload)
+        assert response.status_code == 200 and wait_for_mail(user, seen, 0)
+        mail_latencies.append(delivery_delay + time.perf_counter() - started)
+
+    poll_latencies = [poll_interval - (t % poll_interval) for t in change_times]
+    mail_poll_latencies = [poll_interval - (t % poll_interval) for t in mail_times]
+    poll_calls = int(duration // poll_interval)
+
+    def summary(latencies):
+        latencies = sorted(latencies)
+        return f"median {latencies[len(latencies) // 2]:.2f}s, p95 {latencies[int(len(latencies) * 0.95)]:.2f}s"
+
+    print(f"{changes} changes over {duration}s, {event_count} events")
+    print(f"push:    {summary(push_latencies)}, {calendar.calls} API calls")
+    print(f"polling: {summary(poll_latencies)}, {poll_calls} API calls (one full events().list every {poll_interval}s)")
+    if mails:
+        print(f"{mails} incoming mails")
+        print(f"push:    {summary(mail_latencies)}, {gmail.calls - gmail_calls} API calls")
+        print(f"polling: {summary(mail_poll_latencies)}, {poll_calls} API calls (one messages().list every {poll_interval}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate Calendar and Gmail push notifications and compare with polling")
+    parser.add_argument("--changes", type=int, default=30)
+    parser.add_argument("--duration", type=int, default=3600, help="simulated seconds")
+    parser.add_argument("--delivery-delay", type=float, default=1.0, help="seconds Google takes to deliver a push")
+    parser.add_argument("--poll-interval", type=int, default=60)
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--mails", type=int, default=10)
+    args = parser.parse_args()
+    simulate(args.changes, args.duration, args.delivery_delay, args.poll_interval, args.events, args.mails)
@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import threading
+from functools import lru_cache
+from urllib.parse import urlsplit
+from collections import OrderedDict
+from dotenv import load_dotenv
+from google.oauth2.credentials import Credentials
+from google.auth.transport.requests import Request
+from google.auth.exceptions import RefreshError
+from google_auth_oauthlib.flow import Flow
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+load_dotenv()
+
+SCOPES = [
+    "https://www.googleapis.com/auth/gmail.readonly",
+    "https://www.googleapis.com/auth/gmail.send",
+    "https://www.googleapis.com/auth/calendar.events",
+    "https://www.googleapis.com/auth/calendar.events.freebusy"
+]
+CREDENTIALS_PATH = os.environ.get("CREDENTIALS_FILE_PATH")
+OAUTH_REDIRECT_URI = os.environ.get("OAUTH_REDIRECT_URI", "http://localhost:5000/oauth2callback")
+TOKENS_DIR = os.environ.get("TOKENS_DIR", "tokens")
+MAX_CACHED_USERS = int(os.environ.get("MAX_CACHED_USERS", "1000"))
+TENANT_REQUESTS_PER_MINUTE = int(os.environ.get("TENANT_REQUESTS_PER_MINUTE", "120"))
+
+APIS = {"gmail": ("gmail", "v1"), "calendar": ("calendar", "v3")}
+
+# oauthlib refuses plain http callbacks; that is only acceptable for local development
+if urlsplit(OAUTH_REDIRECT_URI).hostname in ("localhost", "127.0.0.1"):
+    os.environ.setdefault("OAUTHLIB_INSECURE_TRANSPORT", "1")
+
+
+# Discovery documents are parsed once per process; building a client from them needs no network
+@lru_cache(maxsize=None)
+def discovery_document(api, version):
+    return json.loads(get_static_doc(api, version))
+
+
+def build_services(creds):
+    return {
+        name: build_from_document(discovery_document(api, version), credentials=creds)
+        for name, (api, version) in APIS.items()
+    }
+
+
+def oauth_flow(state=None, code_verifier=None):
+    return Flow.from_client_secrets_file(CREDENTIALS_PATH, SCOPES, state=state, code_verifier=code_verifier,
+                                         redirect_uri=OAUTH_REDIRECT_URI)
+
+
+# (url, state, PKCE code verifier); the caller keeps state and verifier for the callback
+def authorization_url():
+    flow = oauth_flow()
+    url, state = flow.authorization_url(access_type="offline", include_granted_scopes="true", prompt="consent")
+    return url, state, flow.code_verifier
+
+
+# Finish the redirect flow and return (user email, credentials). The response URL is rebuilt from
+# OAUTH_REDIRECT_URI, since behind a TLS-terminating proxy the request itself arrives over http.
+def complete_authorization(state, code_verifier, query_string):
+    flow = oauth_flow(state, code_verifier)
+    flow.fetch_token(authorization_response=f"{OAUTH_REDIRECT_URI}?{query_string}")
+    creds = flow.credentials
+    gmail = build_from_document(discovery_document("gmail", "v1"), credentials=creds)
+    email = gmail.users().getProfile(userId="me").execute()["emailAddress"].lower()
+    save_credentials(email, creds)
+    return email, creds
+
+
+def token_path(user):
+    return os.path.join(TOKENS_DIR, user.replace("/", "_") + ".json")
+
+
+def save_credentials(user, creds):
+    os.makedirs(TOKENS_DIR, exist_ok=True)
+    path = token_path(user)
+    with open(path + ".tmp", "w") as f:
+        f.write(creds.to_json())
+    os.replace(path + ".tmp", path)
+
+
+def load_credentials(user):
+    path = token_path(user)
+    if not os.path.exists(path):
+        return None
+    creds = Credentials.from_authorized_user_file(path)
+    # Tokens granted before a scope was added have to go through sign-in again
+    if not creds.has_scopes(SCOPES):
+        return None
+    if not creds.valid and creds.expired and creds.refresh_token:
+        try:
+            creds.refresh(Request())
+        except RefreshError:
+            return None
+        save_credentials(user, creds)
+    return creds if creds.valid else None
+
+
+_services = OrderedDict()
+_services_lock = threading.Lock()
+
+
+# Built clients per user, least recently used evicted past MAX_CACHED_USERS.
+# The google-auth credentials inside refresh themselves, so cached clients stay usable.
+def get_services(user):
+    with _services_lock:
+        if user in _services:
+            _services.move_to_end(user)
+            return _services[user]
+    creds = load_credentials(user)
+    if creds is None:
+        return None
+    services = build_services(creds)
+    with _services_lock:
+        _services[user] = services
+        _services.move_to_end(user)
+        while len(_services) > MAX_CACHED_USERS:
+            _services.popitem(last=False)
+    return services
+
+
+def forget_user(user):
+    with _services_lock:
+        _services.pop(user, None)
+    path = token_path(user)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def tenant_of(user):
+    return user.rsplit("@", 1)[-1]
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+# Token bucket per tenant (email domain) refilled at TENANT_REQUESTS_PER_MINUTE
+def take_quota(tenant, cost=1, per_minute=TENANT_REQUESTS_PER_MINUTE):
+    now = time.monotonic()
+    with _buckets_lock:
+        tokens, updated = _buckets.get(tenant, (per_minute, now))
+        tokens = min(per_minute, tokens + (now - updated) * per_minute / 60)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        _buckets[tenant] = (tokens, now)
+    return allowed
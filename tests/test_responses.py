@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from responses import find_date, find_time_range, validate_date, validate_time_range
+from timezones import now_in
+
+TZ = "Asia/Kolkata"
+
+
+def days_from_today(days):
+    return (now_in(TZ) + timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+def test_find_date_rejects_impossible_iso_date():
+    assert find_date("meet on 2031-02-30", TZ) is None
+
+
+def test_find_date_rejects_past_dates():
+    assert find_date("meet on 2020-01-01", TZ) is None
+    assert validate_date("yesterday", TZ) is None
+
+
+def test_find_date_accepts_future_iso_date():
+    assert find_date(f"meet on {days_from_today(3)}", TZ) == days_from_today(3)
+
+
+def test_find_date_takes_the_first_date_in_the_message():
+    assert find_date("call today about the april 30 release", TZ) == days_from_today(0)
+
+
+def test_find_date_unique_leaves_several_dates_to_the_model():
+    assert find_date("move it from tomorrow to the day after tomorrow", TZ, unique=True) is None
+    assert find_date("move it to tomorrow", TZ, unique=True) == days_from_today(1)
+
+
+def test_find_date_understands_misspelled_month():
+    assert find_date("aprl 9", TZ) is not None
+    assert validate_date("aprl 9", TZ) == find_date("april 9", TZ)
+
+
+def test_find_time_range_normalizes_spacing():
+    assert find_time_range("from 10 am to 11:30 pm") == "10am to 11:30pm"
+
+
+def test_validate_time_range_rejects_backwards_range():
+    assert validate_time_range("4pm to 3pm") is None
+    assert validate_time_range("3pm to 3pm") is None
+
+
+def test_validate_time_range_rejects_impossible_hours():
+    assert validate_time_range("13pm to 14pm") is None
+    assert validate_time_range("10am to 11:75am") is None
+
+
+def test_find_time_range_skips_invalid_candidates():
+    assert find_time_range("not 4pm to 3pm but 5pm to 6pm") == "5pm to 6pm"
+    assert find_time_range("from 3pm to 4pm to 5pm to 6pm", unique=True) is None
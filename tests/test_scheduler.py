@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from scheduler import find_slots, propose_alternatives
+
+KOLKATA = ZoneInfo("Asia/Kolkata")
+LONDON = ZoneInfo("Europe/London")
+NEW_YORK = ZoneInfo("America/New_York")
+# Monday 2030-01-07, 12:00 in Kolkata
+ORIGIN = datetime(2030, 1, 7, 12, tzinfo=KOLKATA)
+HOUR = timedelta(hours=1)
+
+
+def local_hours(moment, zone):
+    local = moment.astimezone(zone)
+    return local.hour + local.minute / 60
+
+
+def test_slots_fall_inside_every_attendees_working_hours():
+    policies = {"a@example.com": {"timezone": "Asia/Kolkata"}, "b@example.com": {"timezone": "Europe/London"}}
+    slots = find_slots({"a@example.com": [], "b@example.com": []}, HOUR, origin=ORIGIN, days=7,
+                       limit=10, policies=policies)
+    assert slots
+    for start, end in slots:
+        for zone in (KOLKATA, LONDON):
+            assert 9 <= local_hours(start, zone) and local_hours(end, zone) <= 18
+
+
+def test_slots_keep_the_buffer_around_busy_time():
+    policies = {"a@example.com": {"timezone": "Asia/Kolkata", "buffer_minutes": 30, "preferred_windows": []}}
+    day = datetime(2030, 1, 8, tzinfo=KOLKATA)
+    busy = [(day.replace(hour=9), day.replace(hour=16))]
+    slots = find_slots({"a@example.com": busy}, HOUR, requested_start=day.replace(hour=16),
+                       origin=ORIGIN, days=3, policies=policies, tz_name="Asia/Kolkata")
+    same_day = [start for start, _ in slots if start.astimezone(KOLKATA).date() == day.date()]
+    assert same_day == [day.replace(hour=16, minute=30)]
+
+
+def test_daily_cap_blocks_the_whole_day():
+    policies = {"a@example.com": {"timezone": "Asia/Kolkata", "max_meetings_per_day": 1}}
+    day = datetime(2030, 1, 8, tzinfo=KOLKATA)
+    busy = [(day.replace(hour=9), day.replace(hour=9, minute=30))]
+    slots = find_slots({"a@example.com": busy}, HOUR, origin=ORIGIN, days=7, limit=10,
+                       policies=policies, tz_name="Asia/Kolkata")
+    assert slots
+    assert all(start.astimezone(KOLKATA).date() != day.date() for start, _ in slots)
+
+
+def test_at_most_one_proposal_per_calendar_day():
+    policies = {"a@example.com": {"timezone": "Asia/Kolkata"}}
+    slots = find_slots({"a@example.com": []}, timedelta(minutes=30), origin=ORIGIN, days=7, limit=10,
+                       policies=policies, tz_name="Asia/Kolkata")
+    days = [start.astimezone(KOLKATA).date() for start, _ in slots]
+    assert len(days) == len(set(days))
+
+
+class FreeCalendar:
+    def freebusy(self):
+        return self
+
+    def query(self, body):
+        self.body = body
+        return self
+
+    def execute(self):
+        return {"calendars": {item["id"]: {"busy": []} for item in self.body["items"]}}
+
+
+def test_attendees_without_a_policy_follow_the_organizer_zone():
+    start = datetime.now(NEW_YORK).replace(hour=10, minute=0, second=0, microsecond=0) + timedelta(days=2)
+    slots = propose_alternatives(FreeCalendar(), ["guest@example.com"], start.isoformat(),
+                                 (start + HOUR).isoformat(), "America/New_York")
+    assert len(slots) == 3
+    for slot_start, slot_end in slots:
+        assert 9 <= local_hours(slot_start, NEW_YORK) and local_hours(slot_end, NEW_YORK) <= 18
+    assert all(slot_start.astimezone(timezone.utc) != start.astimezone(timezone.utc) for slot_start, _ in slots)
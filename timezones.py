@@ -0,0 +1,173 @@
+import os
+import re
+import threading
+from functools import lru_cache
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from zoneinfo import ZoneInfo, available_timezones
+
+import dateparser
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_TIMEZONE = os.environ.get("DEFAULT_TIMEZONE", "Asia/Kolkata")
+DEFAULT_LOCALE = os.environ.get("DEFAULT_LOCALE", "en-IN")
+MAX_LEARNED_TIMEZONES = int(os.environ.get("MAX_LEARNED_TIMEZONES", "10000"))
+
+# Locales that write dates month first
+MONTH_FIRST_REGIONS = {"US", "PH", "FM", "MH", "PW", "BZ"}
+
+TIME_PATTERN = re.compile(r"^\s*(\d{1,2})(?::(\d{2}))?\s*(am|pm)?\s*$")
+ISO_DATE_PATTERN = re.compile(r"^\s*\d{4}-\d{2}-\d{2}\s*$")
+
+# Offsets learned from participants' email replies, keyed by (organizer, participant) in lowercase so one
+# user's mailbox never changes another user's invitations; least recently used evicted past MAX_LEARNED_TIMEZONES
+participant_timezones = OrderedDict()
+_participant_lock = threading.Lock()
+
+
+# Client-supplied names are checked against this set before anything is cached on them
+VALID_TIMEZONES = frozenset(available_timezones())
+LOCALE_PATTERN = re.compile(r"^[A-Za-z]{2,3}(?:-[A-Za-z0-9]{2,8}){0,3}$")
+
+
+def normalize_timezone(name):
+    return name if isinstance(name, str) and name in VALID_TIMEZONES else DEFAULT_TIMEZONE
+
+
+def normalize_locale(locale):
+    if not locale or not isinstance(locale, str):
+        return DEFAULT_LOCALE
+    # Accept-Language style "en-US,en;q=0.9" -> "en-US"
+    locale = locale[:64].split(",")[0].split(";")[0].strip().replace("_", "-")
+    return locale if LOCALE_PATTERN.match(locale) else DEFAULT_LOCALE
+
+
+def get_zone(name):
+    return _zone(normalize_timezone(name))
+
+
+@lru_cache(maxsize=1024)
+def _zone(name):
+    return ZoneInfo(name)
+
+
+def detect_user_zone(payload, headers):
+    tz_name = normalize_timezone(payload.get("timezone"))
+    locale = normalize_locale(payload.get("locale") or headers.get("Accept-Language"))
+    return tz_name, locale
+
+
+@lru_cache(maxsize=256)
+def dateparser_languages(locale):
+    language = locale.split("-")[0].lower()
+    return tuple(dict.fromkeys([language, "en"]))
+
+
+# Built once per (timezone, locale); dateparser copies settings, so sharing the dict is safe
+@lru_cache(maxsize=256)
+def dateparser_settings(tz_name, locale):
+    region = locale.split("-")[-1].upper()
+    return {
+        "PREFER_DATES_FROM": "future",
+        "TIMEZONE": tz_name,
+        "TO_TIMEZONE": tz_name,
+        "RETURN_AS_TIMEZONE_AWARE": True,
+        "DATE_ORDER": "MDY" if region in MONTH_FIRST_REGIONS else "DMY"
+    }
+
+
+def now_in(tz_name=DEFAULT_TIMEZONE):
+    return datetime.now(get_zone(tz_name))
+
+
+def parse_date(text, tz_name=DEFAULT_TIMEZONE, locale=DEFAULT_LOCALE):
+    tz_name, locale = normalize_timezone(tz_name), normalize_locale(locale)
+    return dateparser.parse(
+        text,
+        languages=list(dateparser_languages(locale)),
+        settings=dateparser_settings(tz_name, locale)
+    )
+
+
+def parse_clock(text):
+    match = TIME_PATTERN.match(text.lower())
+    if not match:
+        return None
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    # "13pm" and "0am" are not clock times
+    if meridiem and not 1 <= hour <= 12:
+        return None
+    if meridiem == "pm" and hour != 12:
+        hour += 12
+    elif meridiem == "am" and hour == 12:
+        hour = 0
+    if hour > 23 or minute > 59:
+        return None
+    return hour, minute
+
+
+# Fast path for the usual "YYYY-MM-DD" + "10am" inputs, dateparser for everything else
+def localize(date_str, time_str, tz_name=DEFAULT_TIMEZONE, locale=DEFAULT_LOCALE):
+    clock = parse_clock(time_str)
+    if clock and ISO_DATE_PATTERN.match(date_str):
+        try:
+            day = datetime.strptime(date_str.strip(), "%Y-%m-%d")
+        except ValueError:
+            return None
+        return day.replace(hour=clock[0], minute=clock[1], tzinfo=get_zone(tz_name))
+    return parse_date(f"{date_str} {time_str}", tz_name, locale)
+
+
+def utc_now_iso():
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def participant_key(email, organizer=None):
+    return (organizer or "").lower(), email.lower()
+
+
+def learn_participant_timezone(email, date_header, organizer=None):
+    try:
+        sent = parsedate_to_datetime(date_header)
+    except (TypeError, ValueError):
+        return None
+    if sent.tzinfo is None:
+        return None
+    zone = timezone(sent.utcoffset())
+    key = participant_key(email, organizer)
+    with _participant_lock:
+        participant_timezones[key] = zone
+        participant_timezones.move_to_end(key)
+        while len(participant_timezones) > MAX_LEARNED_TIMEZONES:
+            participant_timezones.popitem(last=False)
+    return zone
+
+
+def participant_timezone(email, organizer=None):
+    key = participant_key(email, organizer)
+    with _participant_lock:
+        zone = participant_timezones.get(key)
+        if zone is not None:
+            participant_timezones.move_to_end(key)
+    return zone
+
+
+def format_time_range(start_iso, end_iso, tz=None):
+    start = datetime.fromisoformat(start_iso)
+    end = datetime.fromisoformat(end_iso)
+    if tz is not None:
+        start, end = start.astimezone(tz), end.astimezone(tz)
+    label = getattr(start.tzinfo, "key", None) or start.strftime("UTC%z")
+    return f"{start.strftime('%A, %d %B %Y, %I:%M %p')} to {end.strftime('%I:%M %p')} ({label})"
+
+
+# Organizer's zone always, plus the participant's own clock when we know it
+def format_for_participant(start_iso, end_iso, participant_email, organizer=None):
+    text = format_time_range(start_iso, end_iso)
+    zone = participant_timezone(participant_email, organizer)
+    if zone is not None and zone.utcoffset(None) != datetime.fromisoformat(start_iso).utcoffset():
+        text += f"\nYour local time: {format_time_range(start_iso, end_iso, zone)}"
+    return text